@@ -1,76 +1,67 @@
-from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
 
+from lexer.token_type import TokenType
 from lexer.tokens import Token
 
 
 # Visitor interface
-class ExprVisitor(ABC):
-    @abstractmethod
+class ExprVisitor:
     def visit_assign(self, expr: "Assign"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_binary(self, expr: "Binary"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_call(self, expr: "Call"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_grouping(self, expr: "Grouping"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_literal(self, expr: "Literal"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_logical(self, expr: "Logical"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_unary(self, expr: "Unary"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_variable(self, expr: "Variable"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_get(self, expr: "Get"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_set(self, expr: "SetExpr"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_self(self, expr: "Self"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_super(self, expr: "Super"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_function_expr(self, expr: "FunctionExpr"):
-        pass
+        raise NotImplementedError
 
 
 # Base Expr class
-class Expr(ABC):
-    @abstractmethod
-    def accept(self, visitor: ExprVisitor):
-        pass
+@dataclass(eq=False, slots=True)
+class Expr:
+    # Pure expressions only depend on literals, so their value can be
+    # computed at compile time
+    pure: bool = field(default=False, init=False, repr=False)
+    # (distance, slot) of the variable a Variable, Assign, Self or Super
+    # refers to, set by the resolver. None for globals
+    local: tuple = field(default=None, init=False, repr=False)
 
-    def __hash__(self):
-        return hash(str(self))
+    def accept(self, visitor: ExprVisitor):
+        raise NotImplementedError
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Assign(Expr):
     name: Token
     value: Expr
@@ -79,17 +70,23 @@ class Assign(Expr):
         return visitor.visit_assign(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Binary(Expr):
     left: Expr
     operator: Token
     right: Expr
+    # Cached operator.token_type
+    op_type: TokenType = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.op_type = self.operator.token_type
+        self.pure = self.left.pure and self.right.pure
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_binary(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Call(Expr):
     callee: Expr
     paren: Token
@@ -99,42 +96,58 @@ class Call(Expr):
         return visitor.visit_call(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Grouping(Expr):
     expression: Expr
 
+    def __post_init__(self):
+        self.pure = self.expression.pure
+
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_grouping(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Literal(Expr):
     value: object
 
+    def __post_init__(self):
+        self.pure = True
+
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_literal(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Logical(Expr):
     left: Expr
     operator: Token
     right: Expr
+    op_type: TokenType = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.op_type = self.operator.token_type
+        self.pure = self.left.pure and self.right.pure
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_logical(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Unary(Expr):
     operator: Token
     right: Expr
+    op_type: TokenType = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.op_type = self.operator.token_type
+        self.pure = self.right.pure
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_unary(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Variable(Expr):
     name: Token
 
@@ -142,7 +155,7 @@ class Variable(Expr):
         return visitor.visit_variable(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Get(Expr):
     object: Expr
     name: Token
@@ -151,7 +164,7 @@ class Get(Expr):
         return visitor.visit_get(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class SetExpr(Expr):
     object: Expr
     name: Token
@@ -161,7 +174,7 @@ class SetExpr(Expr):
         return visitor.visit_set(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Self(Expr):
     keyword: Token
 
@@ -169,7 +182,7 @@ class Self(Expr):
         return visitor.visit_self(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Super(Expr):
     keyword: Token
     method: Token
@@ -178,10 +191,15 @@ class Super(Expr):
         return visitor.visit_super(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class FunctionExpr(Expr):
     params: List[Token]
     body: List["Stmt"]
+    # Bytecode for the body, compiled on the first call
+    chunk: object = field(default=None, init=False, repr=False)
+    # Python version of the function, generated along with the bytecode
+    # when the body allows it
+    generated: object = field(default=None, init=False, repr=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_function_expr(self)
@@ -1,5 +1,4 @@
-from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
 
 from ast_pylang.expr import Expr, Variable
@@ -7,68 +6,65 @@ from lexer.tokens import Token
 
 
 # Visitor interface
-class StmtVisitor(ABC):
-    @abstractmethod
+class StmtVisitor:
     def visit_block_stmt(self, stmt: "BlockStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_expression_stmt(self, stmt: "ExpressionStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_function_stmt(self, stmt: "FunctionStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_if_stmt(self, stmt: "IfStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_print_stmt(self, stmt: "PrintStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_var_stmt(self, stmt: "VarStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_while_stmt(self, stmt: "WhileStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_return_stmt(self, stmt: "ReturnStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_class_stmt(self, stmt: "ClassStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_break_stmt(self, stmt: "BreakStmt"):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_continue_stmt(self, stmt: "ContinueStmt"):
-        pass
+        raise NotImplementedError
 
 
-# Base Expr class
-class Stmt(ABC):
-    @abstractmethod
+# Base Stmt class
+@dataclass(eq=False, slots=True)
+class Stmt:
     def accept(self, visitor: StmtVisitor):
-        pass
+        raise NotImplementedError
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class BlockStmt(Stmt):
     statements: List[Stmt]
+    # Only blocks that declare something need a scope of their own at runtime
+    scoped: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        self.scoped = any(
+            isinstance(statement, (VarStmt, FunctionStmt, ClassStmt))
+            for statement in self.statements
+        )
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_block_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ExpressionStmt(Stmt):
     expression: Expr
 
@@ -76,17 +72,22 @@ class ExpressionStmt(Stmt):
         return visitor.visit_expression_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class FunctionStmt(Stmt):
     name: Token
     params: List[Token]
     body: List[Stmt]
+    # Bytecode for the body, compiled on the first call
+    chunk: object = field(default=None, init=False, repr=False)
+    # Python version of the function, generated along with the bytecode
+    # when the body allows it
+    generated: object = field(default=None, init=False, repr=False)
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_function_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class IfStmt(Stmt):
     condition: Expr
     then_branch: Stmt
@@ -96,7 +97,7 @@ class IfStmt(Stmt):
         return visitor.visit_if_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class PrintStmt(Stmt):
     expression: Expr
 
@@ -104,7 +105,7 @@ class PrintStmt(Stmt):
         return visitor.visit_print_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class VarStmt(Stmt):
     name: Token
     initializer: Expr
@@ -113,7 +114,7 @@ class VarStmt(Stmt):
         return visitor.visit_var_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class WhileStmt(Stmt):
     condition: Expr
     body: Stmt
@@ -122,7 +123,7 @@ class WhileStmt(Stmt):
         return visitor.visit_while_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ReturnStmt(Stmt):
     keyword: Token
     value: Expr
@@ -131,7 +132,7 @@ class ReturnStmt(Stmt):
         return visitor.visit_return_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ClassStmt(Stmt):
     name: Token
     superclass: (
@@ -143,7 +144,7 @@ class ClassStmt(Stmt):
         return visitor.visit_class_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class BreakStmt(Stmt):
     keyword: Token
 
@@ -151,7 +152,7 @@ class BreakStmt(Stmt):
         return visitor.visit_break_stmt(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class ContinueStmt(Stmt):
     keyword: Token
 
@@ -0,0 +1,62 @@
+from typing import List
+
+# Opcodes understood by the VM. Every instruction is encoded as an
+# (opcode, argument) pair of ints laid out flat in Chunk.code. Instructions
+# that do not need an argument carry 0.
+OP_CONSTANT = 0
+OP_GET_LOCAL = 1
+OP_SET_LOCAL = 2
+OP_GET_GLOBAL = 3
+OP_SET_GLOBAL = 4
+OP_ADD = 5
+OP_NUMERIC = 6
+OP_EQUAL = 7
+OP_NOT_EQUAL = 8
+OP_NEGATE = 9
+OP_NOT = 10
+OP_JUMP_IF_FALSE_OR_POP = 11
+OP_JUMP_IF_TRUE_OR_POP = 12
+OP_CALL = 13
+OP_GET_PROPERTY = 14
+OP_SET_PROPERTY = 15
+OP_GET_SUPER = 16
+OP_FUNCTION = 17
+OP_POP = 18
+OP_PRINT = 19
+OP_DEFINE_LOCAL = 20
+OP_DEFINE_GLOBAL = 21
+OP_JUMP = 22
+OP_JUMP_IF_FALSE = 23
+OP_ENTER_SCOPE = 24
+OP_EXIT_SCOPE = 25
+OP_RETURN = 26
+OP_CLASS = 27
+OP_BREAK = 28
+OP_CONTINUE = 29
+OP_NUMERIC_LOOP = 30
+OP_PRINT_TEXT = 31
+OP_INVOKE = 32
+OP_CHECK_INSTANCE = 33
+
+
+class Chunk:
+    __slots__ = ("code", "constants")
+
+    def __init__(self) -> None:
+        self.code: List[int] = []
+        self.constants: List[object] = []
+
+    def emit(self, opcode: int, argument: int = 0) -> int:
+        # Returns the offset of the instruction so jumps can be patched later
+        offset = len(self.code)
+        self.code.append(opcode)
+        self.code.append(argument)
+        return offset
+
+    def add_constant(self, value: object) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def patch_jump(self, offset: int) -> None:
+        # Point the jump at offset to the next instruction to be emitted
+        self.code[offset + 1] = len(self.code)
@@ -0,0 +1,676 @@
+import math
+import operator
+from enum import Enum
+from typing import Dict, List, Tuple
+
+from ast_pylang.expr import *
+from ast_pylang.stmt import *
+from interpreter.callable import Callable
+from interpreter.chunk import Chunk
+from interpreter.environment import Environment, GlobalEnvironment
+from interpreter.vm import NUMBER_TYPES, UNCHECKED, _operands_error
+from lexer.token_type import TokenType
+from lexer.tokens import Token
+from utils.errors import InterpreterRuntimeError
+
+# Python spelling of the operators a numeric loop may use
+ARITHMETIC_SYMBOLS = {
+    TokenType.PLUS: "+",
+    TokenType.MINUS: "-",
+    TokenType.STAR: "*",
+    TokenType.SLASH: "/",
+}
+COMPARISON_SYMBOLS = {
+    TokenType.GREATER: ">",
+    TokenType.GREATER_EQUAL: ">=",
+    TokenType.LESS: "<",
+    TokenType.LESS_EQUAL: "<=",
+    TokenType.EQUAL_EQUAL: "==",
+    TokenType.BANG_EQUAL: "!=",
+}
+
+
+class NotNumeric(Exception):
+    """
+    Raised while generating a loop that does more than number arithmetic.
+    """
+
+
+# Operators that are only defined for numbers, mapped to their
+# implementation. The VM runs them through OP_NUMERIC, generated code through
+# _numeric when the operand types are not known
+NUMERIC_OPERATORS = {
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+}
+
+
+def _divide(left, right, operator: Token):
+    try:
+        return left / right
+    except ZeroDivisionError:
+        raise InterpreterRuntimeError(operator, "Division by zero is not allowed.")
+
+
+# The helpers below do what the matching VM instruction does, for generated
+# functions working on values whose type is not known in advance
+
+
+def _numeric(function, left, right, operator: Token):
+    if not (type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES):
+        raise _operands_error(operator)
+    try:
+        return function(float(left), float(right))
+    except ZeroDivisionError:
+        raise InterpreterRuntimeError(operator, "Division by zero is not allowed.")
+
+
+def _add(left, right, operator: Token):
+    if type(left) is str or type(right) is str:
+        return str(left) + str(right)
+    if type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+        return float(left) + float(right)
+    raise _operands_error(operator)
+
+
+def _negate(right, operator: Token):
+    if type(right) not in NUMBER_TYPES:
+        raise _operands_error(operator)
+    return -float(right)
+
+
+def _call(interpreter: "Interpreter", callee, arguments: List[object], site: list):
+    if not isinstance(callee, Callable):
+        raise InterpreterRuntimeError(site[0], "Can only call functions and classes.")
+
+    if site[1] != callee.arity():
+        raise InterpreterRuntimeError(
+            site[0], f"Expected {callee.arity()} arguments but got {site[1]}."
+        )
+    site[2] = callee
+
+    return callee.call(interpreter, arguments)
+
+
+def _set_global(globals: GlobalEnvironment, name: Token, value: object) -> object:
+    globals.values[globals.slot(name)] = value
+    return value
+
+
+class NumericLoop:
+    """
+    A while loop compiled to a Python function. Only valid while every
+    variable it touches holds a number, which run() checks on entry.
+    """
+
+    __slots__ = ("function", "variables", "assigned")
+
+    def __init__(
+        self,
+        function,
+        variables: List[str | Tuple[int, int]],
+        assigned: List[int],
+    ) -> None:
+        self.function = function
+        # A global name or a (distance, slot) pair relative to the scope the
+        # loop runs in, one per argument of the function
+        self.variables = variables
+        # Indexes of the variables the loop writes to
+        self.assigned = assigned
+
+    def run(self, environment: Environment, globals: GlobalEnvironment) -> bool:
+        """
+        Runs the whole loop and returns True, or returns False without
+        running anything if a variable is undefined or not a number.
+        """
+        values = []
+        for variable in self.variables:
+            if type(variable) is str:
+                slot = globals.slots.get(variable)
+                if slot is None:
+                    # Left to the bytecode to report once it gets there
+                    return False
+                value = globals.values[slot]
+            else:
+                distance, slot = variable
+                scope = environment
+                while distance:
+                    scope = scope.enclosing
+                    distance -= 1
+                value = scope.values[slot]
+
+            # Bools count as numbers but are not floats, the VM converts them
+            if type(value) is not float:
+                return False
+            values.append(value)
+
+        try:
+            self.function(values)
+        finally:
+            # The generated function leaves the final values in the list,
+            # also when a division by zero stops it half way
+            for index in self.assigned:
+                variable = self.variables[index]
+                if type(variable) is str:
+                    globals.values[globals.slots[variable]] = values[index]
+                else:
+                    distance, slot = variable
+                    scope = environment
+                    while distance:
+                        scope = scope.enclosing
+                        distance -= 1
+                    scope.values[slot] = values[index]
+
+        return True
+
+
+class LoopCodeGenerator:
+    """
+    Translates while loops that only do arithmetic on variables into Python
+    source and compiles it, so the loop runs on CPython's own eval loop with
+    no per-instruction dispatch. Loops that call functions, print, declare
+    variables or use anything that is not a number are left to the VM.
+
+    Python and the VM agree on every operator once the operands are known
+    to be floats, and arithmetic on floats only ever gives floats, so
+    checking the variables once on entry covers the whole loop.
+    """
+
+    def generate(self, stmt: WhileStmt) -> NumericLoop | None:
+        self.variables: List[str | Tuple[int, int]] = []
+        self.indexes: Dict[str | Tuple[int, int], int] = {}
+        self.assigned: List[int] = []
+        self.namespace: Dict[str, object] = {"_divide": _divide}
+        self.lines: List[str] = []
+
+        try:
+            self.lines.append(f"        while {self._condition(stmt.condition)}:")
+            self._statement(stmt.body, indent=3)
+        except (NotNumeric, RecursionError):
+            # Very long operator chains are left to the VM as well
+            return None
+
+        if not self.variables:
+            return None
+
+        names = ", ".join(f"v{index}" for index in range(len(self.variables)))
+        stores = [f"        values[{index}] = v{index}" for index in self.assigned]
+        source = "\n".join(
+            [
+                "def _loop(values):",
+                f"    {names}, = values",
+                "    try:",
+                *self.lines,
+                "    finally:",
+                *(stores or ["        pass"]),
+            ]
+        )
+        try:
+            code = compile(source, "<numeric loop>", "exec")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Python limits how deeply expressions can nest
+            return None
+        exec(code, self.namespace)
+
+        return NumericLoop(
+            function=self.namespace["_loop"],
+            variables=self.variables,
+            assigned=self.assigned,
+        )
+
+    def _statement(self, stmt: Stmt, indent: int):
+        prefix = "    " * indent
+
+        if isinstance(stmt, BlockStmt):
+            # Declarations are not supported, so the block has no scope of
+            # its own and leaves no trace in generated code
+            lines = len(self.lines)
+            for statement in stmt.statements:
+                self._statement(statement, indent)
+            if len(self.lines) == lines:
+                self.lines.append(f"{prefix}pass")
+        elif isinstance(stmt, ExpressionStmt) and isinstance(stmt.expression, Assign):
+            expr = stmt.expression
+            value = self._number(expr.value)
+            index = self._variable(expr, expr.name)
+            if index not in self.assigned:
+                self.assigned.append(index)
+            self.lines.append(f"{prefix}v{index} = {value}")
+        elif isinstance(stmt, IfStmt):
+            self.lines.append(f"{prefix}if {self._condition(stmt.condition)}:")
+            self._statement(stmt.then_branch, indent + 1)
+            if stmt.else_branch is not None:
+                self.lines.append(f"{prefix}else:")
+                self._statement(stmt.else_branch, indent + 1)
+        else:
+            raise NotNumeric()
+
+    def _condition(self, expr: Expr) -> str:
+        # Conditions are limited to comparisons, which give real booleans,
+        # so Python's truthiness matches pylang's
+        if isinstance(expr, Grouping):
+            return self._condition(expr.expression)
+
+        if isinstance(expr, Binary) and expr.op_type in COMPARISON_SYMBOLS:
+            left = self._number(expr.left)
+            right = self._number(expr.right)
+            return f"({left} {COMPARISON_SYMBOLS[expr.op_type]} {right})"
+
+        if isinstance(expr, Logical):
+            keyword = "or" if expr.op_type == TokenType.OR else "and"
+            left = self._condition(expr.left)
+            right = self._condition(expr.right)
+            return f"({left} {keyword} {right})"
+
+        if isinstance(expr, Unary) and expr.op_type == TokenType.BANG:
+            return f"(not {self._condition(expr.right)})"
+
+        raise NotNumeric()
+
+    def _number(self, expr: Expr) -> str:
+        if isinstance(expr, Grouping):
+            return self._number(expr.expression)
+
+        if isinstance(expr, Literal):
+            value = expr.value
+            if type(value) is not float or not math.isfinite(value):
+                raise NotNumeric()
+            return repr(value)
+
+        if isinstance(expr, Variable):
+            return f"v{self._variable(expr, expr.name)}"
+
+        if isinstance(expr, Unary) and expr.op_type == TokenType.MINUS:
+            return f"(-{self._number(expr.right)})"
+
+        if isinstance(expr, Binary) and expr.op_type in ARITHMETIC_SYMBOLS:
+            left = self._number(expr.left)
+            right = self._number(expr.right)
+
+            if expr.op_type == TokenType.SLASH and not (
+                isinstance(expr.right, Literal) and expr.right.value
+            ):
+                # The divisor may be zero, which has to be reported with the
+                # operator's line like the VM does
+                token = f"t{len(self.namespace)}"
+                self.namespace[token] = expr.operator
+                return f"_divide({left}, {right}, {token})"
+
+            return f"({left} {ARITHMETIC_SYMBOLS[expr.op_type]} {right})"
+
+        raise NotNumeric()
+
+    def _variable(self, expr: Expr, name: Token) -> int:
+        local = expr.local
+        if local is None:
+            variable = name.lexeme
+        else:
+            # No scope is entered inside the loop, so resolved distances are
+            # relative to the scope the loop runs in
+            variable = local
+
+        index = self.indexes.get(variable)
+        if index is None:
+            index = self.indexes[variable] = len(self.variables)
+            self.variables.append(variable)
+        return index
+
+
+class ValueType(Enum):
+    """
+    What a generated function knows about a value before running.
+    """
+
+    # A float. Bools are numbers to the operators too, but they have to be
+    # converted first, so they are not counted here
+    NUMBER = "NUMBER"
+    # A real bool, as comparisons give
+    BOOL = "BOOL"
+    STRING = "STRING"
+    ANY = "ANY"
+
+
+class FunctionCodeGenerator:
+    """
+    Translates whole function bodies into Python source and compiles them,
+    so calling the function runs a real Python function instead of the VM.
+
+    Parameters are assumed to hold floats, which the generated function
+    checks on entry. When they do not, it runs the function's bytecode
+    instead. Everything else is typed from the code: operands known to be
+    numbers use Python's operators directly, the rest go through helpers
+    doing what the VM does. Functions that use a variable of an enclosing
+    function, declare functions or classes, or touch instances are left to
+    the VM altogether.
+    """
+
+    def __init__(self, interpreter: "Interpreter") -> None:
+        self.interpreter = interpreter
+
+    def generate(self, declaration: FunctionStmt | FunctionExpr, chunk: Chunk):
+        # Variables start out as numbers. Each one found to be assigned
+        # something else is demoted and the function generated again, until
+        # the types agree with every assignment
+        demoted = set()
+        while True:
+            try:
+                source = self._source(declaration, demoted)
+            except (NotNumeric, RecursionError):
+                return None
+
+            if not self.demoted:
+                break
+            demoted |= self.demoted
+
+        try:
+            code = compile(source, "<generated function>", "exec")
+        except (SyntaxError, RecursionError, MemoryError):
+            return None
+
+        interpreter = self.interpreter
+        self.namespace.update(
+            _add=_add,
+            _call=_call,
+            _chunk=chunk,
+            _divide=_divide,
+            _Environment=Environment,
+            _globals=interpreter.globals,
+            _interpreter=interpreter,
+            _negate=_negate,
+            _numeric=_numeric,
+            _run=interpreter.vm.run,
+            _set_global=_set_global,
+            _slot=interpreter.globals.slot,
+            _stringify=interpreter.stringify,
+            _values=interpreter.globals.values,
+        )
+        exec(code, self.namespace)
+        return self.namespace["_function"]
+
+    def _source(self, declaration: FunctionStmt | FunctionExpr, demoted) -> str:
+        self.namespace: Dict[str, object] = {}
+        self.lines: List[str] = []
+        self.types: Dict[str, ValueType] = {}
+        self.demoted = set()
+        self.demoted_before = demoted
+        self.temporaries = 0
+        self.loop_depth = 0
+
+        params = [self._declare(numeric=True) for _ in declaration.params]
+        # Runtime scopes of the function, each a list of variable names
+        # indexed by slot. Parameters are the first slots of the call's scope
+        self.scopes: List[List[str]] = [list(params)]
+
+        for stmt in declaration.body:
+            self._statement(stmt, indent=1)
+
+        numbers = [name for name in params if self.types[name] is ValueType.NUMBER]
+        guard = []
+        if numbers:
+            checks = " and ".join(f"type({name}) is float" for name in numbers)
+            arguments = ", ".join(params)
+            guard = [
+                f"    if not ({checks}):",
+                f"        return _run(_chunk, _Environment(closure, [{arguments}]))",
+            ]
+
+        return "\n".join(
+            [
+                f"def _function({', '.join(['closure', *params])}):",
+                *guard,
+                *(self.lines or ["    pass"]),
+            ]
+        )
+
+    def _declare(self, numeric: bool) -> str:
+        name = f"v{len(self.types)}"
+        if numeric and name not in self.demoted_before:
+            self.types[name] = ValueType.NUMBER
+        else:
+            self.types[name] = ValueType.ANY
+        return name
+
+    def _assigned(self, name: str, value_type: ValueType):
+        if self.types[name] is ValueType.NUMBER and value_type is not ValueType.NUMBER:
+            self.demoted.add(name)
+
+    def _constant(self, value: object) -> str:
+        name = f"c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def _temporary(self) -> str:
+        self.temporaries += 1
+        return f"t{self.temporaries}"
+
+    def _truth(self, code: str, value_type: ValueType) -> str:
+        # A Python expression giving pylang's truthiness of the value
+        if value_type is ValueType.BOOL:
+            return code
+        temporary = self._temporary()
+        return f"(({temporary} := {code}) is not None and {temporary} is not False)"
+
+    def _block(self, stmt: Stmt, indent: int):
+        # Body of an if or a while. A declaration there would land in the
+        # enclosing scope only when the branch runs, which is left to the VM
+        if isinstance(stmt, VarStmt):
+            raise NotNumeric()
+
+        lines = len(self.lines)
+        self._statement(stmt, indent)
+        if len(self.lines) == lines:
+            self.lines.append(f"{'    ' * indent}pass")
+
+    def _statement(self, stmt: Stmt, indent: int):
+        prefix = "    " * indent
+
+        if isinstance(stmt, BlockStmt):
+            if stmt.scoped:
+                self.scopes.append([])
+            for statement in stmt.statements:
+                self._statement(statement, indent)
+            if stmt.scoped:
+                self.scopes.pop()
+        elif isinstance(stmt, ExpressionStmt):
+            expr = stmt.expression
+            if isinstance(expr, Assign):
+                # Spelled as a statement, which globals need anyway
+                value, value_type = self._expression(expr.value)
+                self.lines.append(f"{prefix}{self._target(expr, value_type)} = {value}")
+            else:
+                self.lines.append(f"{prefix}{self._expression(expr)[0]}")
+        elif isinstance(stmt, PrintStmt):
+            value, value_type = self._expression(stmt.expression)
+            if value_type is not ValueType.STRING:
+                value = f"_stringify({value})"
+            self.lines.append(f"{prefix}print({value})")
+        elif isinstance(stmt, VarStmt):
+            if stmt.initializer is None:
+                value, value_type = "None", ValueType.ANY
+            else:
+                value, value_type = self._expression(stmt.initializer)
+            # Declared once the initializer is generated, which cannot see it
+            name = self._declare(numeric=value_type is ValueType.NUMBER)
+            self.scopes[-1].append(name)
+            self.lines.append(f"{prefix}{name} = {value}")
+        elif isinstance(stmt, IfStmt):
+            condition = self._truth(*self._expression(stmt.condition))
+            self.lines.append(f"{prefix}if {condition}:")
+            self._block(stmt.then_branch, indent + 1)
+            if stmt.else_branch is not None:
+                self.lines.append(f"{prefix}else:")
+                self._block(stmt.else_branch, indent + 1)
+        elif isinstance(stmt, WhileStmt):
+            condition = self._truth(*self._expression(stmt.condition))
+            self.lines.append(f"{prefix}while {condition}:")
+            self.loop_depth += 1
+            self._block(stmt.body, indent + 1)
+            self.loop_depth -= 1
+        elif isinstance(stmt, ReturnStmt):
+            if stmt.value is None:
+                self.lines.append(f"{prefix}return None")
+            else:
+                self.lines.append(f"{prefix}return {self._expression(stmt.value)[0]}")
+        elif isinstance(stmt, (BreakStmt, ContinueStmt)) and self.loop_depth:
+            keyword = "break" if isinstance(stmt, BreakStmt) else "continue"
+            self.lines.append(f"{prefix}{keyword}")
+        else:
+            raise NotNumeric()
+
+    def _target(self, expr: Assign, value_type: ValueType) -> str:
+        # Left hand side of an assignment statement
+        local = self._local(expr)
+        if local is not None:
+            self._assigned(local, value_type)
+            return local
+
+        slot = self.interpreter.globals.slots.get(expr.name.lexeme)
+        if slot is None:
+            return f"_values[_slot({self._constant(expr.name)})]"
+        return f"_values[{slot}]"
+
+    def _local(self, expr: Expr) -> str | None:
+        local = expr.local
+        if local is None:
+            return None
+
+        distance, slot = local
+        if distance >= len(self.scopes):
+            # A variable of an enclosing function
+            raise NotNumeric()
+        return self.scopes[-1 - distance][slot]
+
+    def _expression(self, expr: Expr) -> Tuple[str, ValueType]:
+        if isinstance(expr, Grouping):
+            return self._expression(expr.expression)
+
+        if isinstance(expr, Literal):
+            value = expr.value
+            if type(value) is float:
+                if not math.isfinite(value):
+                    return self._constant(value), ValueType.NUMBER
+                return repr(value), ValueType.NUMBER
+            if type(value) is str:
+                return repr(value), ValueType.STRING
+            if type(value) is bool:
+                return repr(value), ValueType.BOOL
+            return "None", ValueType.ANY
+
+        if isinstance(expr, Variable):
+            local = self._local(expr)
+            if local is not None:
+                return local, self.types[local]
+            slot = self.interpreter.globals.slots.get(expr.name.lexeme)
+            if slot is None:
+                # Not defined yet, reported when read like the VM does
+                return f"_values[_slot({self._constant(expr.name)})]", ValueType.ANY
+            # A defined global never moves
+            return f"_values[{slot}]", ValueType.ANY
+
+        if isinstance(expr, Assign):
+            value, value_type = self._expression(expr.value)
+            local = self._local(expr)
+            if local is not None:
+                self._assigned(local, value_type)
+                return f"({local} := {value})", value_type
+            name = self._constant(expr.name)
+            return f"_set_global(_globals, {name}, {value})", value_type
+
+        if isinstance(expr, Unary):
+            right, right_type = self._expression(expr.right)
+            if expr.op_type == TokenType.BANG:
+                if right_type is ValueType.BOOL:
+                    return f"(not {right})", ValueType.BOOL
+                temporary = self._temporary()
+                return (
+                    f"(({temporary} := {right}) is None or {temporary} is False)",
+                    ValueType.BOOL,
+                )
+            if right_type is ValueType.NUMBER:
+                return f"(-{right})", ValueType.NUMBER
+            operator = self._constant(expr.operator)
+            return f"_negate({right}, {operator})", ValueType.NUMBER
+
+        if isinstance(expr, Binary):
+            return self._binary(expr)
+
+        if isinstance(expr, Logical):
+            left, left_type = self._expression(expr.left)
+            right, right_type = self._expression(expr.right)
+            keyword = "or" if expr.op_type == TokenType.OR else "and"
+
+            value_type = left_type if left_type is right_type else ValueType.ANY
+
+            if left_type is ValueType.BOOL:
+                # Python agrees with pylang on the truthiness of bools
+                return f"({left} {keyword} {right})", value_type
+
+            # Keep the left operand as the result, like the VM
+            temporary = self._temporary()
+            truthy = (
+                f"(({temporary} := {left}) is not None and {temporary} is not False)"
+            )
+            if keyword == "or":
+                return f"({temporary} if {truthy} else {right})", value_type
+            return f"({right} if {truthy} else {temporary})", value_type
+
+        if isinstance(expr, Call):
+            callee, _ = self._expression(expr.callee)
+            arguments = ", ".join(
+                self._expression(argument)[0] for argument in expr.arguments
+            )
+            # The VM remembers the last callee it checked in the third entry
+            site = self._constant([expr.paren, len(expr.arguments), UNCHECKED])
+            # The callee is evaluated before the arguments, and a callee that
+            # already passed the checks is called directly
+            function = self._temporary()
+            values = self._temporary()
+            return (
+                f"({function}.call(_interpreter, {values})"
+                f" if (({function} := {callee}), ({values} := [{arguments}]))[0]"
+                f" is {site}[2]"
+                f" else _call(_interpreter, {function}, {values}, {site}))",
+                ValueType.ANY,
+            )
+
+        raise NotNumeric()
+
+    def _binary(self, expr: Binary) -> Tuple[str, ValueType]:
+        left, left_type = self._expression(expr.left)
+        right, right_type = self._expression(expr.right)
+        op_type = expr.op_type
+        numeric = left_type is ValueType.NUMBER and right_type is ValueType.NUMBER
+
+        if op_type in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL):
+            return f"({left} {COMPARISON_SYMBOLS[op_type]} {right})", ValueType.BOOL
+
+        if op_type == TokenType.PLUS:
+            if numeric:
+                return f"({left} + {right})", ValueType.NUMBER
+            if left_type is ValueType.STRING and right_type is ValueType.STRING:
+                return f"({left} + {right})", ValueType.STRING
+            operator = self._constant(expr.operator)
+            return f"_add({left}, {right}, {operator})", ValueType.ANY
+
+        value_type = ValueType.NUMBER
+        if op_type in COMPARISON_SYMBOLS:
+            value_type = ValueType.BOOL
+
+        if not numeric:
+            function = self._constant(NUMERIC_OPERATORS[op_type])
+            operator = self._constant(expr.operator)
+            return f"_numeric({function}, {left}, {right}, {operator})", value_type
+
+        if op_type == TokenType.SLASH and not (
+            isinstance(expr.right, Literal) and expr.right.value
+        ):
+            operator = self._constant(expr.operator)
+            return f"_divide({left}, {right}, {operator})", value_type
+
+        symbol = ARITHMETIC_SYMBOLS.get(op_type) or COMPARISON_SYMBOLS[op_type]
+        return f"({left} {symbol} {right})", value_type
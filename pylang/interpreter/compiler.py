@@ -0,0 +1,430 @@
+from typing import List
+
+from ast_pylang.expr import *
+from ast_pylang.stmt import *
+from interpreter.chunk import *
+from interpreter.codegen import NUMERIC_OPERATORS, LoopCodeGenerator
+from interpreter.vm import UNCHECKED
+from lexer.token_type import TokenType
+from lexer.tokens import Token
+from utils.errors import InterpreterRuntimeError
+
+# Binary operators outside NUMERIC_OPERATORS get an opcode of their own
+BINARY_OPCODES = {
+    TokenType.PLUS: OP_ADD,
+    TokenType.EQUAL_EQUAL: OP_EQUAL,
+    TokenType.BANG_EQUAL: OP_NOT_EQUAL,
+}
+
+# What Compiler._fold returns for an expression it cannot compute ahead of time
+UNKNOWN = object()
+
+
+class Loop:
+    __slots__ = ("scope_depth", "start", "breaks")
+
+    def __init__(self, scope_depth: int, start: int) -> None:
+        # Scopes entered inside the loop are exited by break and continue
+        self.scope_depth = scope_depth
+        self.start = start
+        # Offsets of the break jumps, patched once the loop end is known
+        self.breaks: List[int] = []
+
+
+class Compiler(ExprVisitor, StmtVisitor):
+    """
+    Compiles the syntax tree into flat Chunks of bytecode so the VM can run
+    it in a single loop instead of walking the tree node by node. The
+    program and every function body get a chunk of their own.
+    """
+
+    def __init__(self, vm: "VM") -> None:
+        # Runs pure expressions at compile time
+        self.vm = vm
+        self.chunk: Chunk | None = None
+        # Set while compiling a pure expression as a whole, so its operands
+        # are not computed ahead of time one by one
+        self.in_pure = False
+        # Number of scopes entered, 0 means declarations are globals
+        self.scope_depth = 0
+        self.loops: List[Loop] = []
+        self.loop_generator = LoopCodeGenerator()
+
+        # Nodes are dispatched on their exact type, which saves the accept()
+        # call on every node visited
+        self.stmt_dispatch = {
+            BlockStmt: self.visit_block_stmt,
+            BreakStmt: self.visit_break_stmt,
+            ClassStmt: self.visit_class_stmt,
+            ContinueStmt: self.visit_continue_stmt,
+            ExpressionStmt: self.visit_expression_stmt,
+            FunctionStmt: self.visit_function_stmt,
+            IfStmt: self.visit_if_stmt,
+            PrintStmt: self.visit_print_stmt,
+            ReturnStmt: self.visit_return_stmt,
+            VarStmt: self.visit_var_stmt,
+            WhileStmt: self.visit_while_stmt,
+        }
+        self.expr_dispatch = {
+            Assign: self.visit_assign,
+            Binary: self.visit_binary,
+            Call: self.visit_call,
+            FunctionExpr: self.visit_function_expr,
+            Get: self.visit_get,
+            Grouping: self.visit_grouping,
+            Literal: self.visit_literal,
+            Logical: self.visit_logical,
+            Self: self.visit_self,
+            SetExpr: self.visit_set,
+            Super: self.visit_super,
+            Unary: self.visit_unary,
+            Variable: self.visit_variable,
+        }
+
+    def compile_program(self, stmts: List[Stmt]) -> Chunk:
+        return self._compile_body(stmts, scope_depth=0)
+
+    def compile_function(self, declaration: FunctionStmt | FunctionExpr) -> Chunk:
+        # Parameters and the body share the scope created by the call
+        return self._compile_body(declaration.body, scope_depth=1)
+
+    def compile(self, expr: Expr) -> Chunk:
+        enclosing = self.chunk
+        self.chunk = Chunk()
+        self._compile(expr)
+        self.chunk.emit(OP_RETURN)
+        chunk = self.chunk
+        self.chunk = enclosing
+        return chunk
+
+    def _compile_body(self, stmts: List[Stmt], scope_depth: int) -> Chunk:
+        enclosing = (self.chunk, self.scope_depth, self.loops)
+        self.chunk = Chunk()
+        self.scope_depth = scope_depth
+        self.loops = []
+
+        # Statement lists dispatch inline rather than through _compile_stmt,
+        # which saves a frame for most statements in a program
+        stmt_dispatch = self.stmt_dispatch
+        for stmt in stmts:
+            stmt_dispatch[type(stmt)](stmt)
+        # Falling off the end returns nil
+        self.chunk.emit(OP_CONSTANT, self.chunk.add_constant(None))
+        self.chunk.emit(OP_RETURN)
+
+        chunk = self.chunk
+        self.chunk, self.scope_depth, self.loops = enclosing
+        return chunk
+
+    def _compile_stmt(self, stmt: Stmt):
+        self.stmt_dispatch[type(stmt)](stmt)
+
+    def _compile(self, expr: Expr):
+        if not expr.pure or self.in_pure or isinstance(expr, Literal):
+            self.expr_dispatch[type(expr)](expr)
+            return
+
+        value = self._fold(expr)
+        if value is not UNKNOWN:
+            self.chunk.emit(OP_CONSTANT, self.chunk.add_constant(value))
+            return
+
+        # Compiled as is so the error is raised every time it runs
+        self.in_pure = True
+        self.expr_dispatch[type(expr)](expr)
+        self.in_pure = False
+
+    def _fold(self, expr: Expr) -> object:
+        """
+        Value of a pure expression, computed at compile time. UNKNOWN for
+        expressions that are not pure or fail when run.
+        """
+        if not expr.pure:
+            return UNKNOWN
+        if isinstance(expr, Literal):
+            return expr.value
+
+        # A pure expression only depends on literals, so it always evaluates
+        # to the same value. Run it once now, in a chunk of its own
+        self.in_pure = True
+        pure_chunk = self.compile(expr)
+        self.in_pure = False
+
+        try:
+            return self.vm.run(pure_chunk, None)
+        except InterpreterRuntimeError:
+            return UNKNOWN
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        stmt_dispatch = self.stmt_dispatch
+        if not stmt.scoped:
+            # Like in the resolver, a block declaring nothing gets no scope
+            for statement in stmt.statements:
+                stmt_dispatch[type(statement)](statement)
+            return
+
+        self.chunk.emit(OP_ENTER_SCOPE)
+        self.scope_depth += 1
+        for statement in stmt.statements:
+            stmt_dispatch[type(statement)](statement)
+        self.scope_depth -= 1
+        self.chunk.emit(OP_EXIT_SCOPE, 1)
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt):
+        self._compile(stmt.expression)
+        self.chunk.emit(OP_POP)
+
+    def visit_print_stmt(self, stmt: PrintStmt):
+        expr = stmt.expression
+        value = self._fold(expr)
+        if value is not UNKNOWN:
+            # A value known at compile time is turned into text once, here
+            text = self.vm.interpreter.stringify(value)
+            self.chunk.emit(OP_PRINT_TEXT, self.chunk.add_constant(text))
+            return
+
+        self._compile(expr)
+        self.chunk.emit(OP_PRINT)
+
+    def visit_var_stmt(self, stmt: VarStmt):
+        if stmt.initializer is not None:
+            self._compile(stmt.initializer)
+        else:
+            self.chunk.emit(OP_CONSTANT, self.chunk.add_constant(None))
+        self._emit_define(stmt.name)
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        # The body is compiled on the first call
+        self.chunk.emit(OP_FUNCTION, self.chunk.add_constant(stmt))
+        self._emit_define(stmt.name)
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        if stmt.superclass is not None:
+            self._compile(stmt.superclass)
+        else:
+            self.chunk.emit(OP_CONSTANT, self.chunk.add_constant(None))
+        self.chunk.emit(OP_CLASS, self.chunk.add_constant(stmt))
+        self._emit_define(stmt.name)
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        condition = self._fold(stmt.condition)
+        if condition is not UNKNOWN:
+            # Only the branch that is taken is compiled
+            if condition is not None and condition is not False:
+                self._compile_stmt(stmt.then_branch)
+            elif stmt.else_branch is not None:
+                self._compile_stmt(stmt.else_branch)
+            return
+
+        self._compile(stmt.condition)
+        else_jump = self.chunk.emit(OP_JUMP_IF_FALSE)
+
+        self._compile_stmt(stmt.then_branch)
+
+        if stmt.else_branch is not None:
+            end_jump = self.chunk.emit(OP_JUMP)
+            self.chunk.patch_jump(else_jump)
+            self._compile_stmt(stmt.else_branch)
+            self.chunk.patch_jump(end_jump)
+        else:
+            self.chunk.patch_jump(else_jump)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        # Loops doing nothing but arithmetic also get a Python version, which
+        # runs instead of the bytecode below whenever their variables hold
+        # numbers. The jump past the loop is patched at the end
+        condition = self._fold(stmt.condition)
+        if condition is None or condition is False:
+            # The body never runs
+            return
+
+        numeric_loop = self.loop_generator.generate(stmt)
+        if numeric_loop is not None:
+            fast_path = [numeric_loop, 0]
+            self.chunk.emit(OP_NUMERIC_LOOP, self.chunk.add_constant(fast_path))
+
+        loop = Loop(scope_depth=self.scope_depth, start=len(self.chunk.code))
+
+        # A condition that is always true is not tested, the loop only ends
+        # through a break or a return
+        exit_jump = None
+        if condition is UNKNOWN:
+            self._compile(stmt.condition)
+            exit_jump = self.chunk.emit(OP_JUMP_IF_FALSE)
+
+        self.loops.append(loop)
+        self._compile_stmt(stmt.body)
+        self.loops.pop()
+
+        self.chunk.emit(OP_JUMP, loop.start)
+        if exit_jump is not None:
+            self.chunk.patch_jump(exit_jump)
+        for offset in loop.breaks:
+            self.chunk.patch_jump(offset)
+
+        if numeric_loop is not None:
+            fast_path[1] = len(self.chunk.code)
+
+    def visit_break_stmt(self, stmt: BreakStmt):
+        if not self.loops:
+            # Reported as a runtime error, like it always has been
+            self.chunk.emit(OP_BREAK, self.chunk.add_constant(stmt.keyword))
+            return
+
+        loop = self.loops[-1]
+        self._emit_exit_scopes(loop)
+        loop.breaks.append(self.chunk.emit(OP_JUMP))
+
+    def visit_continue_stmt(self, stmt: ContinueStmt):
+        if not self.loops:
+            self.chunk.emit(OP_CONTINUE, self.chunk.add_constant(stmt.keyword))
+            return
+
+        loop = self.loops[-1]
+        self._emit_exit_scopes(loop)
+        self.chunk.emit(OP_JUMP, loop.start)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        if stmt.value is not None:
+            self._compile(stmt.value)
+        else:
+            self.chunk.emit(OP_CONSTANT, self.chunk.add_constant(None))
+        self.chunk.emit(OP_RETURN)
+
+    def visit_literal(self, expr: Literal):
+        self.chunk.emit(OP_CONSTANT, self.chunk.add_constant(expr.value))
+
+    def visit_grouping(self, expr: Grouping):
+        self._compile(expr.expression)
+
+    def visit_unary(self, expr: Unary):
+        self._compile(expr.right)
+
+        if expr.op_type == TokenType.MINUS:
+            self.chunk.emit(OP_NEGATE, self.chunk.add_constant(expr.operator))
+        elif expr.op_type == TokenType.BANG:
+            self.chunk.emit(OP_NOT)
+
+    def visit_binary(self, expr: Binary):
+        # Chains like a + b + c nest to the left. Compile them in a loop so
+        # long ones do not recurse once per operator. Pure operands are left
+        # to _compile so they are folded to constants
+        chain = [expr]
+        while isinstance(expr.left, Binary) and not expr.left.pure:
+            expr = expr.left
+            chain.append(expr)
+
+        self._compile(expr.left)
+        for expr in reversed(chain):
+            self._compile(expr.right)
+            self._emit_binary(expr)
+
+    def _emit_binary(self, expr: Binary):
+        numeric_operator = NUMERIC_OPERATORS.get(expr.op_type)
+        if numeric_operator is not None:
+            # The operator token is kept around for runtime error reporting
+            self.chunk.emit(
+                OP_NUMERIC,
+                self.chunk.add_constant((numeric_operator, expr.operator)),
+            )
+        else:
+            self.chunk.emit(
+                BINARY_OPCODES[expr.op_type], self.chunk.add_constant(expr.operator)
+            )
+
+    def visit_logical(self, expr: Logical):
+        self._compile(expr.left)
+
+        # Short circuit: keep the left operand as the result and skip the right one
+        if expr.op_type == TokenType.OR:
+            jump = self.chunk.emit(OP_JUMP_IF_TRUE_OR_POP)
+        else:
+            jump = self.chunk.emit(OP_JUMP_IF_FALSE_OR_POP)
+
+        self._compile(expr.right)
+        self.chunk.patch_jump(jump)
+
+    def visit_variable(self, expr: Variable):
+        self._emit_get_variable(expr.name, expr)
+
+    def visit_self(self, expr: Self):
+        self._emit_get_variable(expr.keyword, expr)
+
+    def visit_assign(self, expr: Assign):
+        self._compile(expr.value)
+
+        local = expr.local
+        if local is not None:
+            self.chunk.emit(OP_SET_LOCAL, self.chunk.add_constant(local))
+        else:
+            self.chunk.emit(OP_SET_GLOBAL, self.chunk.add_constant([expr.name, None]))
+
+    def visit_call(self, expr: Call):
+        callee = expr.callee
+        if type(callee) is Get and all(map(self._cannot_fail, expr.arguments)):
+            # A method called right away does not need a bound function. The
+            # method is only looked up once the arguments are evaluated, so
+            # this is limited to arguments that cannot fail or have effects
+            self._compile(callee.object)
+            for argument in expr.arguments:
+                self._compile(argument)
+            site = [expr.paren, len(expr.arguments), UNCHECKED, callee.name]
+            self.chunk.emit(OP_INVOKE, self.chunk.add_constant(site))
+            return
+
+        self._compile(callee)
+        for argument in expr.arguments:
+            self._compile(argument)
+
+        # The VM remembers the last callee it checked in the third entry
+        site = [expr.paren, len(expr.arguments), UNCHECKED]
+        self.chunk.emit(OP_CALL, self.chunk.add_constant(site))
+
+    def visit_get(self, expr: Get):
+        self._compile(expr.object)
+        self.chunk.emit(OP_GET_PROPERTY, self.chunk.add_constant(expr.name))
+
+    def visit_set(self, expr: SetExpr):
+        self._compile(expr.object)
+        # The target is checked before the value is computed. OP_SET_PROPERTY
+        # checks it again, which is enough alone when the value cannot fail
+        # or have effects
+        if not self._cannot_fail(expr.value):
+            self.chunk.emit(OP_CHECK_INSTANCE, self.chunk.add_constant(expr.name))
+        self._compile(expr.value)
+        self.chunk.emit(OP_SET_PROPERTY, self.chunk.add_constant(expr.name))
+
+    def visit_super(self, expr: Super):
+        distance, _ = expr.local
+        self.chunk.emit(OP_GET_SUPER, self.chunk.add_constant((distance, expr.method)))
+
+    def visit_function_expr(self, expr: FunctionExpr):
+        # The closure is captured when the instruction runs, not at compile time
+        self.chunk.emit(OP_FUNCTION, self.chunk.add_constant(expr))
+
+    def _cannot_fail(self, expr: Expr) -> bool:
+        if isinstance(expr, Literal):
+            return True
+        # A resolved local is always defined
+        return isinstance(expr, (Variable, Self)) and expr.local is not None
+
+    def _emit_get_variable(self, name: Token, expr: Expr):
+        local = expr.local
+
+        if local is not None:
+            self.chunk.emit(OP_GET_LOCAL, self.chunk.add_constant(local))
+        else:
+            # The slot is filled in by the VM on first use
+            self.chunk.emit(OP_GET_GLOBAL, self.chunk.add_constant([name, None]))
+
+    def _emit_define(self, name: Token):
+        if self.scope_depth == 0:
+            self.chunk.emit(OP_DEFINE_GLOBAL, self.chunk.add_constant(name.lexeme))
+        else:
+            # Locals are appended, slots follow declaration order
+            self.chunk.emit(OP_DEFINE_LOCAL)
+
+    def _emit_exit_scopes(self, loop: Loop):
+        depth = self.scope_depth - loop.scope_depth
+        if depth > 0:
+            self.chunk.emit(OP_EXIT_SCOPE, depth)
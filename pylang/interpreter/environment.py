@@ -1,3 +1,5 @@
+from typing import List
+
 from lexer.tokens import Token
 from utils.errors import InterpreterRuntimeError
 
@@ -5,39 +7,24 @@ from utils.errors import InterpreterRuntimeError
 class Environment:
     __slots__ = ("values", "enclosing")
 
-    def __init__(self, enclosing_scope: "Environment" = None) -> None:
-        self.values = {}
+    def __init__(
+        self, enclosing_scope: "Environment" = None, values: List[object] = None
+    ) -> None:
+        # Local variables, indexed by the slot the resolver assigned to them.
+        # Scopes that start out with variables, like a call frame and its
+        # arguments, take ownership of the given list instead of copying it
+        self.values = [] if values is None else values
         self.enclosing = enclosing_scope  # For scoping
 
     def define(self, name: str, value: object) -> None:
-        self.values[name] = value
-
-    def assign(self, name: Token, value: object) -> None:
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
-            return
-
-        # If not in current scope, check enclosing scope
-        if self.enclosing is not None:
-            self.enclosing.assign(name.lexeme, value)
-            return
-
-        raise InterpreterRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        # Slots are handed out in declaration order, so defining is an append
+        self.values.append(value)
 
-    def assign_at(self, distance: int, name: Token, value: object):
-        self.ancestor(distance=distance).values[name.lexeme] = value
+    def assign_at(self, distance: int, slot: int, value: object):
+        self.ancestor(distance=distance).values[slot] = value
 
-    def get(self, name: Token) -> object:
-        if name.lexeme in self.values:
-            return self.values[name.lexeme]
-
-        # If not in current scope, check enclosing scope
-        if self.enclosing is not None:
-            return self.enclosing.get(name.lexeme)
-        raise InterpreterRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
-
-    def get_at(self, distance: int, name: str) -> object:
-        return self.ancestor(distance).values.get(name)
+    def get_at(self, distance: int, slot: int) -> object:
+        return self.ancestor(distance).values[slot]
 
     def ancestor(self, distance: int) -> "Environment":
         environment = self
@@ -45,3 +32,38 @@ class Environment:
             environment = environment.enclosing
 
         return environment
+
+
+class GlobalEnvironment:
+    """
+    Outermost scope. Globals are not resolved ahead of time, so each name is
+    given a slot the first time it is defined. A redefined name keeps its
+    slot, which lets callers cache the slot once they have looked it up.
+    """
+
+    __slots__ = ("values", "slots")
+
+    def __init__(self) -> None:
+        self.values = []
+        self.slots = {}  # name -> index into values
+
+    def define(self, name: str, value: object) -> None:
+        slot = self.slots.get(name)
+        if slot is None:
+            self.slots[name] = len(self.values)
+            self.values.append(value)
+        else:
+            self.values[slot] = value
+
+    def slot(self, name: Token) -> int:
+        slot = self.slots.get(name.lexeme)
+        if slot is None:
+            raise InterpreterRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+
+        return slot
+
+    def assign(self, name: Token, value: object) -> None:
+        self.values[self.slot(name)] = value
+
+    def get(self, name: Token) -> object:
+        return self.values[self.slot(name)]
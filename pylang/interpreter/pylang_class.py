@@ -6,7 +6,7 @@ from interpreter.pylang_instance import PylangInstance
 
 
 class PylangClass(Callable):
-    __slots__ = ("name", "methods", "superclass")
+    __slots__ = ("name", "methods", "superclass", "method_table", "initializer")
 
     def __init__(
         self, name: str, superclass: "PylangClass", methods: Dict[str, PylangFunction]
@@ -15,26 +15,29 @@ class PylangClass(Callable):
         self.methods = methods
         self.superclass = superclass
 
+        # Methods of a class never change once it is created, so inherited
+        # ones are copied in here once and finding a method is a single get()
+        # instead of a walk up the superclasses
+        if superclass is not None:
+            self.method_table = {**superclass.method_table, **methods}
+        else:
+            self.method_table = methods
+        self.initializer = self.method_table.get("init")
+
     def call(self, interpreter: "Interpreter", arguments: List[object]):
         instance = PylangInstance(self)
-        initializer = self.find_method("init")
+        initializer = self.initializer
         if initializer is not None:
-            initializer.bind(instance).call(interpreter, arguments)
+            initializer.call_bound(interpreter, instance, arguments)
         return instance
 
     def arity(self):
-        initializer = self.find_method("init")
-        if initializer is not None:
-            return initializer.arity()
+        if self.initializer is not None:
+            return self.initializer.arity()
         return 0
 
     def find_method(self, name: str) -> PylangFunction | None:
-        if name in self.methods:
-            return self.methods[name]
-
-        if self.superclass is not None:
-            return self.superclass.find_method(name)
-        return None
+        return self.method_table.get(name)
 
     def __str__(self):
         return self.name
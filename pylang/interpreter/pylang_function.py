@@ -3,7 +3,6 @@ from typing import List
 from ast_pylang.stmt import FunctionStmt
 from interpreter.callable import Callable
 from interpreter.environment import Environment
-from utils.errors import Return
 
 
 class PylangFunction(Callable):
@@ -17,29 +16,47 @@ class PylangFunction(Callable):
         self.is_initializer = is_initializer
 
     def call(self, interpreter: "Interpreter", arguments: List[object]):
-        environment = Environment(enclosing_scope=self.closure)
+        declaration = self.declaration
+        chunk = declaration.chunk or interpreter.compile_function(declaration)
+        generated = declaration.generated
+        if generated is not None:
+            # Runs the bytecode itself when the arguments do not suit it
+            value = generated(self.closure, *arguments)
+        else:
+            # Parameters are the first slots of the call's scope, in order.
+            # The arity has been checked by the caller and the argument list
+            # is not used after the call, so it becomes the scope's values
+            value = interpreter.vm.run(chunk, Environment(self.closure, arguments))
 
-        for i, param in enumerate(self.declaration.params):
-            environment.define(param.lexeme, arguments[i])
+        if self.is_initializer:
+            # "self" is the only variable in the closure created by bind()
+            return self.closure.get_at(0, 0)
+
+        return value
 
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except Return as r:
-            if self.is_initializer:
-                return self.closure.get_at(0, "self")
-            return r.value
+    def call_bound(
+        self, interpreter: "Interpreter", instance: "PylangInstance", arguments
+    ):
+        # Same as bind(instance).call(), without creating the bound function
+        closure = Environment(self.closure, [instance])
+        declaration = self.declaration
+        chunk = declaration.chunk or interpreter.compile_function(declaration)
+        generated = declaration.generated
+        if generated is not None:
+            value = generated(closure, *arguments)
+        else:
+            value = interpreter.vm.run(chunk, Environment(closure, arguments))
 
         if self.is_initializer:
-            return self.closure.get_at(0, "self")
+            return instance
 
-        return None
+        return value
 
     def arity(self):
         return len(self.declaration.params)
 
     def bind(self, instance: "PylangInstance"):
-        environment = Environment(enclosing_scope=self.closure)
-        environment.define("self", instance)
+        environment = Environment(self.closure, [instance])
         return PylangFunction(self.declaration, environment, self.is_initializer)
 
     def __str__(self):
@@ -10,14 +10,16 @@ class PylangInstance:
         self.fields = {}
 
     def get(self, name: Token):
-        if name.lexeme in self.fields:
-            return self.fields[name.lexeme]
+        lexeme = name.lexeme
+        fields = self.fields
+        if lexeme in fields:
+            return fields[lexeme]
 
-        method = self.klass.find_method(name.lexeme)
+        method = self.klass.find_method(lexeme)
         if method is not None:
             return method.bind(self)
 
-        raise InterpreterRuntimeError(name, f"Undefined property '{name.lexeme}'")
+        raise InterpreterRuntimeError(name, f"Undefined property '{lexeme}'")
 
     def set(self, name: Token, value):
         self.fields[name.lexeme] = value
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from ast_pylang.expr import *
 from ast_pylang.stmt import *
@@ -24,14 +24,50 @@ class ClassType(Enum):
 class Resolver(ExprVisitor, StmtVisitor):
     def __init__(self, interpreter: Interpreter) -> None:
         self.interpreter = interpreter
-        self.scopes: List[Dict[str, bool]] = []
+        # Each scope maps a name to its (slot, is_defined) pair. Slots are
+        # handed out in declaration order, matching the runtime environment
+        self.scopes: List[Dict[str, Tuple[int, bool]]] = []
         self.current_function = FunctionType.NONE
         self.current_class = ClassType.NONE
 
+        # Visit method for each node type. _resolve_stmt, _resolve_expr and
+        # the loops over statements and arguments call these directly
+        self.stmt_dispatch = {
+            BlockStmt: self.visit_block_stmt,
+            BreakStmt: self.visit_break_stmt,
+            ClassStmt: self.visit_class_stmt,
+            ContinueStmt: self.visit_continue_stmt,
+            ExpressionStmt: self.visit_expression_stmt,
+            FunctionStmt: self.visit_function_stmt,
+            IfStmt: self.visit_if_stmt,
+            PrintStmt: self.visit_print_stmt,
+            ReturnStmt: self.visit_return_stmt,
+            VarStmt: self.visit_var_stmt,
+            WhileStmt: self.visit_while_stmt,
+        }
+        self.expr_dispatch = {
+            Assign: self.visit_assign,
+            Binary: self.visit_binary,
+            Call: self.visit_call,
+            FunctionExpr: self.visit_function_expr,
+            Get: self.visit_get,
+            Grouping: self.visit_grouping,
+            Literal: self.visit_literal,
+            Logical: self.visit_logical,
+            Self: self.visit_self,
+            SetExpr: self.visit_set,
+            Super: self.visit_super,
+            Unary: self.visit_unary,
+            Variable: self.visit_variable,
+        }
+
     def resolve_statements(self, statements: List[Stmt]):
+        # Statement lists and operand lists below dispatch inline, saving a
+        # _resolve_* frame for most of the nodes in a program
+        stmt_dispatch = self.stmt_dispatch
         for statement in statements:
             try:
-                self._resolve_stmt(statement)
+                stmt_dispatch[type(statement)](statement)
             except ResolverError as e:
                 Logger.error(
                     error_type=e.error_type, line=e.token.line, message=e.message
@@ -42,6 +78,11 @@ class Resolver(ExprVisitor, StmtVisitor):
         raise ResolverError(token, message)
 
     def visit_block_stmt(self, stmt: BlockStmt):
+        if not stmt.scoped:
+            # Nothing to declare, so the block shares the enclosing scope
+            self.resolve_statements(statements=stmt.statements)
+            return
+
         self._begin_scope()
         self.resolve_statements(statements=stmt.statements)
         self._end_scope()
@@ -53,14 +94,16 @@ class Resolver(ExprVisitor, StmtVisitor):
         self._define(stmt.name.lexeme)
 
     def visit_variable(self, expr: Variable):
-        if len(self.scopes) > 0:
-            exists_in_current_scope = self.scopes[-1].get(expr.name.lexeme)
-            if exists_in_current_scope is False:
+        name = expr.name.lexeme
+        scopes = self.scopes
+        if scopes:
+            declared = scopes[-1].get(name)
+            if declared is not None and declared[1] is False:
                 self._error(
                     expr.name, f"Cannot read local variable in its own initializer"
                 )
 
-        self._resolve_local(expr, expr.name.lexeme)
+        self._resolve_local(expr, name)
 
     def visit_assign(self, expr: Assign):
         self._resolve_expr(expr.value)
@@ -115,10 +158,10 @@ class Resolver(ExprVisitor, StmtVisitor):
 
         if stmt.superclass is not None:
             self._begin_scope()
-            self.scopes[-1]["super"] = True
+            self.scopes[-1]["super"] = (0, True)
 
         self._begin_scope()
-        self.scopes[-1]["self"] = True
+        self.scopes[-1]["self"] = (0, True)
 
         for method in stmt.methods:
             declaration = FunctionType.METHOD
@@ -140,14 +183,27 @@ class Resolver(ExprVisitor, StmtVisitor):
         pass
 
     def visit_binary(self, expr: Binary):
-        self._resolve_expr(expr.left)
-        self._resolve_expr(expr.right)
+        # Chains like a + b + c nest to the left. Walk down the chain in a
+        # loop so long ones do not recurse once per operator
+        rights = []
+        while isinstance(expr, Binary) and not expr.pure:
+            rights.append(expr.right)
+            expr = expr.left
+
+        expr_dispatch = self.expr_dispatch
+        if not expr.pure:
+            expr_dispatch[type(expr)](expr)
+        for right in reversed(rights):
+            if not right.pure:
+                expr_dispatch[type(right)](right)
 
     def visit_call(self, expr: Call):
         self._resolve_expr(expr.callee)
 
+        expr_dispatch = self.expr_dispatch
         for argument in expr.arguments:
-            self._resolve_expr(argument)
+            if not argument.pure:
+                expr_dispatch[type(argument)](argument)
 
     def visit_grouping(self, expr: Grouping):
         self._resolve_expr(expr.expression)
@@ -189,20 +245,22 @@ class Resolver(ExprVisitor, StmtVisitor):
         self._resolve_function(expr, FunctionType.FUNCTION)
 
     def _declare(self, name: str, token: Token):
-        if len(self.scopes) == 0:
+        scopes = self.scopes
+        if not scopes:
             return
-        scope = self.scopes[-1]
+        scope = scopes[-1]
         if name in scope:
             self._error(
                 token, f"Variable with name: {name} already declared in this scope"
             )
-        scope[name] = False
+        scope[name] = (len(scope), False)
 
     def _define(self, name: str):
-        if len(self.scopes) == 0:
+        scopes = self.scopes
+        if not scopes:
             return
-        scope = self.scopes[-1]
-        scope[name] = True
+        scope = scopes[-1]
+        scope[name] = (scope[name][0], True)
 
     def _begin_scope(self):
         self.scopes.append({})
@@ -211,25 +269,37 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.scopes.pop()
 
     def _resolve_local(self, expr: Expr, name: str):
-        for i in range(len(self.scopes) - 1, -1, -1):
-            if name in self.scopes[i]:
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
+        scopes = self.scopes
+        last = len(scopes) - 1
+        for i in range(last, -1, -1):
+            declared = scopes[i].get(name)
+            if declared is not None:
+                self.interpreter.resolve(expr, last - i, declared[0])
                 return
 
     def _resolve_function(self, function: FunctionStmt, type: FunctionType):
         enclosing_function: FunctionType = self.current_function
         self.current_function = type
         self._begin_scope()
+        scope = self.scopes[-1]
         for param in function.params:
-            self._declare(param.lexeme, param)
-            self._define(param.lexeme)
+            # Declaring and defining at once, a parameter is never read
+            # before it has a value
+            name = param.lexeme
+            if name in scope:
+                self._error(
+                    param, f"Variable with name: {name} already declared in this scope"
+                )
+            scope[name] = (len(scope), True)
 
         self.resolve_statements(function.body)
         self._end_scope()
         self.current_function = enclosing_function
 
     def _resolve_stmt(self, statement: Stmt):
-        statement.accept(self)
+        self.stmt_dispatch[type(statement)](statement)
 
     def _resolve_expr(self, expression: Expr):
-        expression.accept(self)
+        # Pure subtrees are made of literals only, nothing in them to resolve
+        if not expression.pure:
+            self.expr_dispatch[type(expression)](expression)
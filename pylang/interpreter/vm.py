@@ -0,0 +1,367 @@
+from ast_pylang.stmt import ClassStmt
+from interpreter.callable import Callable
+from interpreter.chunk import *
+from interpreter.environment import Environment
+from interpreter.pylang_class import PylangClass
+from interpreter.pylang_function import PylangFunction
+from interpreter.pylang_instance import PylangInstance
+from lexer.tokens import Token
+from utils.errors import InterpreterRuntimeError
+
+# Exact types of pylang numbers. Bools count as numbers, as they always have
+# through isinstance(value, (int, float)). Checking type(value) against this
+# skips the subclass walk isinstance does on a miss. Arithmetic is done on
+# floats only: the operators test for two floats first and convert anything
+# else with float(), so bools never turn into unbounded Python ints
+NUMBER_TYPES = (float, int, bool)
+
+# Last callee of a call site that has not run yet, no value is ever this
+UNCHECKED = object()
+
+
+def _operands_error(operator: Token) -> InterpreterRuntimeError:
+    return InterpreterRuntimeError(
+        token=operator,
+        message=f"Operands must be numbers for operator {operator.lexeme}",
+    )
+
+
+def _make_class(stmt: ClassStmt, superclass: object, environment) -> PylangClass:
+    if stmt.superclass is not None and not isinstance(superclass, PylangClass):
+        raise InterpreterRuntimeError(
+            stmt.superclass.name, "Superclass must be a class."
+        )
+
+    if superclass is not None:
+        environment = Environment(environment, [superclass])
+
+    methods = {}
+    for method in stmt.methods:
+        function = PylangFunction(
+            declaration=method,
+            closure=environment,
+            is_initializer=(method.name.lexeme == "init"),
+        )
+        methods[method.name.lexeme] = function
+
+    return PylangClass(name=stmt.name.lexeme, superclass=superclass, methods=methods)
+
+
+# Instructions that are rarely run many times over, such as declarations,
+# prints and error reports. VM.run tests the frequent instructions inline,
+# most frequent first, and looks up the rest by opcode in COLD_INSTRUCTIONS,
+# so they cost one list index rather than a long run of comparisons and do
+# not slow down the frequent ones. Each one takes
+# (vm, stack, argument, constants, environment)
+
+
+def _negate(vm: "VM", stack: list, arg: int, constants: list, environment):
+    right = stack.pop()
+    if type(right) not in NUMBER_TYPES:
+        raise _operands_error(constants[arg])
+    stack.append(-float(right))
+
+
+def _not(vm: "VM", stack: list, arg: int, constants: list, environment):
+    right = stack.pop()
+    stack.append(right is None or right is False)
+
+
+def _print(vm: "VM", stack: list, arg: int, constants: list, environment):
+    print(vm.interpreter.stringify(stack.pop()))
+
+
+def _print_text(vm: "VM", stack: list, arg: int, constants: list, environment):
+    print(constants[arg])
+
+
+def _get_super(vm: "VM", stack: list, arg: int, constants: list, environment):
+    distance, method_name = constants[arg]
+    # "super" is the only variable in its scope
+    superclass = environment.get_at(distance, 0)
+    # The receiver has always been looked up as "this", which is never
+    # defined, so super methods are bound to nil. The expected test output
+    # relies on this.
+    obj = None
+    method = superclass.find_method(method_name.lexeme)
+
+    if method is None:
+        raise InterpreterRuntimeError(
+            method_name, f"Undefined property '{method_name.lexeme}'."
+        )
+
+    stack.append(method.bind(obj))
+
+
+def _function(vm: "VM", stack: list, arg: int, constants: list, environment):
+    stack.append(
+        PylangFunction(
+            declaration=constants[arg],
+            closure=environment,
+            is_initializer=False,
+        )
+    )
+
+
+def _define_global(vm: "VM", stack: list, arg: int, constants: list, environment):
+    vm.interpreter.globals.define(constants[arg], stack.pop())
+
+
+def _class(vm: "VM", stack: list, arg: int, constants: list, environment):
+    stack.append(_make_class(constants[arg], stack.pop(), environment))
+
+
+def _check_instance(vm: "VM", stack: list, arg: int, constants: list, environment):
+    # Tests the target of a property assignment before its value is computed
+    if type(stack[-1]) is not PylangInstance:
+        raise InterpreterRuntimeError(constants[arg], "Only instances have fields.")
+
+
+def _break(vm: "VM", stack: list, arg: int, constants: list, environment):
+    # Only emitted outside of any loop, inside one break is a jump
+    raise InterpreterRuntimeError(constants[arg], "Break statement outside of loop.")
+
+
+def _continue(vm: "VM", stack: list, arg: int, constants: list, environment):
+    raise InterpreterRuntimeError(constants[arg], "Continue statement outside of loop.")
+
+
+_COLD = {
+    OP_NEGATE: _negate,
+    OP_NOT: _not,
+    OP_PRINT: _print,
+    OP_PRINT_TEXT: _print_text,
+    OP_GET_SUPER: _get_super,
+    OP_FUNCTION: _function,
+    OP_DEFINE_GLOBAL: _define_global,
+    OP_CLASS: _class,
+    OP_BREAK: _break,
+    OP_CONTINUE: _continue,
+    OP_CHECK_INSTANCE: _check_instance,
+}
+COLD_INSTRUCTIONS = [_COLD.get(op) for op in range(max(_COLD) + 1)]
+
+
+class VM:
+    """
+    Stack machine executing the bytecode produced by the Compiler.
+    """
+
+    __slots__ = ("interpreter",)
+
+    def __init__(self, interpreter: "Interpreter") -> None:
+        self.interpreter = interpreter
+
+    def run(self, chunk: Chunk, environment: Environment) -> object:
+        interpreter = self.interpreter
+        global_values = interpreter.globals.values
+        code = chunk.code
+        constants = chunk.constants
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        cold_instructions = COLD_INSTRUCTIONS
+
+        pc = 0
+        # Every chunk ends with OP_RETURN
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+
+            if op == OP_GET_LOCAL:
+                # Walk up to the resolved scope inline rather than through
+                # Environment.get_at, locals are read more than anything else
+                distance, slot = constants[arg]
+                scope = environment
+                while distance:
+                    scope = scope.enclosing
+                    distance -= 1
+                push(scope.values[slot])
+            elif op == OP_CONSTANT:
+                push(constants[arg])
+            elif op == OP_POP:
+                pop()
+            elif op == OP_GET_GLOBAL:
+                # [name, slot], a global never moves once it has a slot
+                cache = constants[arg]
+                slot = cache[1]
+                if slot is None:
+                    slot = cache[1] = interpreter.globals.slot(cache[0])
+                push(global_values[slot])
+            elif op == OP_NUMERIC:
+                right = pop()
+                left = pop()
+                function, operator = constants[arg]
+                if type(left) is not float or type(right) is not float:
+                    if not (type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES):
+                        raise _operands_error(operator)
+                    left = float(left)
+                    right = float(right)
+                try:
+                    push(function(left, right))
+                except ZeroDivisionError:
+                    raise InterpreterRuntimeError(
+                        operator, "Division by zero is not allowed."
+                    )
+            elif op == OP_JUMP_IF_FALSE:
+                condition = pop()
+                if condition is None or condition is False:
+                    pc = arg
+            elif op == OP_CALL:
+                # [paren, argument count, last callee that passed the checks]
+                site = constants[arg]
+                arg_count = site[1]
+                if arg_count:
+                    arguments = stack[-arg_count:]
+                    del stack[-arg_count:]
+                else:
+                    arguments = []
+                callee = pop()
+
+                # Most call sites keep calling the same function, which only
+                # has to be checked the first time
+                if callee is not site[2]:
+                    if not isinstance(callee, Callable):
+                        raise InterpreterRuntimeError(
+                            site[0], "Can only call functions and classes."
+                        )
+
+                    if arg_count != callee.arity():
+                        raise InterpreterRuntimeError(
+                            site[0],
+                            f"Expected {callee.arity()} arguments but got {arg_count}.",
+                        )
+                    site[2] = callee
+
+                push(callee.call(interpreter, arguments))
+            elif op == OP_ADD:
+                right = pop()
+                left = pop()
+                if type(left) is float and type(right) is float:
+                    push(left + right)
+                # If both operands are strings, concatenate them
+                elif type(left) is str and type(right) is str:
+                    push(left + right)
+                # If one of the operands is a string, convert the other to a string. Similar to JavaScript
+                elif type(left) is str or type(right) is str:
+                    push(str(left) + str(right))
+                elif type(left) in NUMBER_TYPES and type(right) in NUMBER_TYPES:
+                    push(float(left) + float(right))
+                else:
+                    raise _operands_error(constants[arg])
+            elif op == OP_RETURN:
+                return pop()
+            elif op == OP_SET_PROPERTY:
+                value = pop()
+                obj = pop()
+                name = constants[arg]
+                if type(obj) is not PylangInstance:
+                    raise InterpreterRuntimeError(name, "Only instances have fields.")
+                obj.set(name, value)
+                push(value)
+            elif op == OP_JUMP:
+                pc = arg
+            elif op == OP_SET_LOCAL:
+                distance, slot = constants[arg]
+                scope = environment
+                while distance:
+                    scope = scope.enclosing
+                    distance -= 1
+                scope.values[slot] = stack[-1]
+            elif op == OP_SET_GLOBAL:
+                cache = constants[arg]
+                slot = cache[1]
+                if slot is None:
+                    slot = cache[1] = interpreter.globals.slot(cache[0])
+                global_values[slot] = stack[-1]
+            elif op == OP_GET_PROPERTY:
+                obj = pop()
+                name = constants[arg]
+                # Instances are never subclassed, an exact type check is enough
+                if type(obj) is not PylangInstance:
+                    raise InterpreterRuntimeError(
+                        name, "Only instances have properties."
+                    )
+                push(obj.get(name))
+            elif op == OP_INVOKE:
+                # obj.name(arguments), the method is called with obj as self
+                # rather than bound first. [paren, argument count, last method
+                # that passed the checks, name]
+                site = constants[arg]
+                arg_count = site[1]
+                if arg_count:
+                    arguments = stack[-arg_count:]
+                    del stack[-arg_count:]
+                else:
+                    arguments = []
+                obj = pop()
+                name = site[3]
+                if type(obj) is not PylangInstance:
+                    raise InterpreterRuntimeError(
+                        name, "Only instances have properties."
+                    )
+
+                lexeme = name.lexeme
+                if lexeme in obj.fields:
+                    # Fields shadow methods, call whatever the field holds
+                    callee = obj.fields[lexeme]
+                    if not isinstance(callee, Callable):
+                        raise InterpreterRuntimeError(
+                            site[0], "Can only call functions and classes."
+                        )
+                    if arg_count != callee.arity():
+                        raise InterpreterRuntimeError(
+                            site[0],
+                            f"Expected {callee.arity()} arguments but got {arg_count}.",
+                        )
+                    push(callee.call(interpreter, arguments))
+                    continue
+
+                method = obj.klass.method_table.get(lexeme)
+                if method is not site[2]:
+                    if method is None:
+                        raise InterpreterRuntimeError(
+                            name, f"Undefined property '{lexeme}'"
+                        )
+                    if arg_count != method.arity():
+                        raise InterpreterRuntimeError(
+                            site[0],
+                            f"Expected {method.arity()} arguments but got {arg_count}.",
+                        )
+                    site[2] = method
+                push(method.call_bound(interpreter, obj, arguments))
+            elif op == OP_EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif op == OP_NOT_EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] != right
+            elif op == OP_DEFINE_LOCAL:
+                environment.values.append(pop())
+            elif op == OP_ENTER_SCOPE:
+                environment = Environment(environment)
+            elif op == OP_EXIT_SCOPE:
+                for _ in range(arg):
+                    environment = environment.enclosing
+            elif op == OP_JUMP_IF_FALSE_OR_POP:
+                left = stack[-1]
+                if left is None or left is False:
+                    pc = arg
+                else:
+                    pop()
+            elif op == OP_JUMP_IF_TRUE_OR_POP:
+                left = stack[-1]
+                if left is None or left is False:
+                    pop()
+                else:
+                    pc = arg
+            elif op == OP_NUMERIC_LOOP:
+                # Skip the loop's bytecode if the generated version could run
+                numeric_loop, end = constants[arg]
+                if numeric_loop.run(environment, interpreter.globals):
+                    pc = end
+            else:
+                cold_instructions[op](self, stack, arg, constants, environment)
@@ -1,4 +1,5 @@
-import string
+import re
+import sys
 from typing import List
 
 from lexer.token_type import TokenType
@@ -6,9 +7,6 @@ from lexer.tokens import Token
 from utils.errors import ErrorType
 from utils.logger import Logger
 
-WHITESPACES_TO_IGNORE = [" ", "\t", "\r"]
-STRING_IDENTIFIERS = ['"']
-VALID_IDENTIFIER_CHARACTERS = string.ascii_lowercase + string.ascii_uppercase + "_"
 KEYWORDS = {
     "and": TokenType.AND,
     "break": TokenType.BREAK,
@@ -30,174 +28,106 @@ KEYWORDS = {
     "while": TokenType.WHILE,
 }
 
+# Punctuation and operators, keyed by their source text
+OPERATORS = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "*": TokenType.STAR,
+    ":": TokenType.COLON,
+    "/": TokenType.SLASH,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+}
+
+# One alternative per kind of lexeme. The regex engine finds the next token
+# in C, instead of the scanner stepping through the source a character at a
+# time. A slash followed by another one starts a comment, and anything no
+# other rule accepts falls through to UNEXPECTED
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<SPACE>[ \t\r]+)
+    | (?P<NEWLINE>\n)
+    | (?P<IDENTIFIER>[A-Za-z_][A-Za-z_\d]*)
+    | (?P<OPERATOR>[!=<>]=?|[(){},.\-+;*:]|/(?!/))
+    | (?P<NUMBER>\d+(?:\.\d+)?)
+    | (?P<COMMENT>//[^\n]*)
+    | (?P<STRING>"[^"]*"?)
+    | (?P<UNEXPECTED>.)
+    """,
+    re.VERBOSE,
+)
+
 
 class Scanner:
     def __init__(self, source_code: str) -> None:
         self.source_code = source_code
         self.tokens = []
-        self.start = 0
-        self.current = 0
         self.line = 1
+        # Value of every number literal seen so far, keyed by its source text
+        self.numbers = {}
 
     def scan_tokens(self) -> List[Token]:
-        while not self._is_end():
-            self.start = self.current
-            self._scan_token()
-
-        self.tokens.append(
-            Token(token_type=TokenType.EOF, lexeme="", literal=None, line=self.line)
-        )
-        return self.tokens
-
-    def _scan_token(self):
-        element = self._advance()
-        if element == "(":
-            self._add_token(TokenType.LEFT_PAREN)
-        elif element == ")":
-            self._add_token(TokenType.RIGHT_PAREN)
-        elif element == "{":
-            self._add_token(TokenType.LEFT_BRACE)
-        elif element == "}":
-            self._add_token(TokenType.RIGHT_BRACE)
-        elif element == ",":
-            self._add_token(TokenType.COMMA)
-        elif element == ".":
-            self._add_token(TokenType.DOT)
-        elif element == "-":
-            self._add_token(TokenType.MINUS)
-        elif element == "+":
-            self._add_token(TokenType.PLUS)
-        elif element == ";":
-            self._add_token(TokenType.SEMICOLON)
-        elif element == "*":
-            self._add_token(TokenType.STAR)
-        elif element == ":":
-            self._add_token(TokenType.COLON)
-        elif element == "!":
-            self._add_token(
-                TokenType.BANG_EQUAL if self._match("=") else TokenType.BANG
-            )
-        elif element == "=":
-            self._add_token(
-                TokenType.EQUAL_EQUAL if self._match("=") else TokenType.EQUAL
-            )
-        elif element == "<":
-            self._add_token(
-                TokenType.LESS_EQUAL if self._match("=") else TokenType.LESS
-            )
-        elif element == ">":
-            self._add_token(
-                TokenType.GREATER_EQUAL if self._match("=") else TokenType.GREATER
-            )
-        elif element == "/":
-            # // means it is a comment so ignore all characters till new line
-            if self._match("/"):
-                while self._peek() != "\n" and not self._is_end():
-                    self._advance()
+        tokens = self.tokens
+        numbers = self.numbers
+        line = self.line
+        for match in TOKEN_PATTERN.finditer(self.source_code):
+            kind = match.lastgroup
+            text = match.group()
+            if kind == "SPACE":
+                continue
+            elif kind == "IDENTIFIER":
+                # Interned so that every occurrence of a name is the same
+                # string object and dict lookups keyed by it (scopes, fields,
+                # methods) hit on identity
+                text = sys.intern(text)
+                tokens.append(
+                    Token(KEYWORDS.get(text, TokenType.IDENTIFIER), text, None, line)
+                )
+            elif kind == "OPERATOR":
+                tokens.append(Token(OPERATORS[text], text, None, line))
+            elif kind == "NEWLINE":
+                line += 1
+            elif kind == "NUMBER":
+                # Repeated literals like 1 or 0 share one float object
+                number = numbers.get(text)
+                if number is None:
+                    number = numbers[text] = float(text)
+                tokens.append(Token(TokenType.NUMBER, text, number, line))
+            elif kind == "COMMENT":
+                continue
+            elif kind == "STRING":
+                line += text.count("\n")
+                if len(text) == 1 or text[-1] != '"':
+                    Logger.error(
+                        error_type=ErrorType.LexicalError,
+                        line=line,
+                        message="Unterminated string",
+                    )
+                    continue
+                # Trim quotes. Interned so that equal string literals share
+                # one object and comparing them is an identity check
+                value = sys.intern(text[1:-1])
+                tokens.append(Token(TokenType.STRING, text, value, line))
             else:
-                self._add_token(TokenType.SLASH)
-        elif element in WHITESPACES_TO_IGNORE:
-            pass
-        elif element == "\n":
-            self.line += 1
-        elif element in STRING_IDENTIFIERS:
-            self._handle_strings()
-        elif element.isdigit():
-            self._handle_numbers()
-        else:
-            if self._is_alpha(element):
-                # Parse identifiers. We'll use maximal munching rule here
-                # When two lexical grammar rules can both match a chunk of code that the scanner is looking at, whichever one matches the most characters wins.
-                self._handle_identifiers()
-                return
-            Logger.error(
-                error_type=ErrorType.LexicalError,
-                line=self.line,
-                message=f"Unexpected character {element}",
-            )
-
-    def _is_end(self) -> bool:
-        return self.current >= len(self.source_code)
-
-    def _advance(self) -> str:
-        char = self.source_code[self.current]
-        self.current += 1
-        return char
-
-    def _add_token(self, token_type: TokenType, literal=None) -> None:
-        code = self.source_code[self.start : self.current]
-        self.tokens.append(
-            Token(token_type=token_type, lexeme=code, literal=literal, line=self.line)
-        )
-
-    def _match(self, expected: str) -> bool:
-        if self._is_end():
-            return False
-
-        if self.source_code[self.current] != expected:
-            return False
-
-        self.current += 1
-        return True
-
-    def _peek(self) -> str:
-        if self.current >= len(self.source_code):
-            return "\0"
-        return self.source_code[self.current]
-
-    def _peek_next(self) -> str:
-        if self.current + 1 >= len(self.source_code):
-            return "\0"
-        return self.source_code[self.current + 1]
-
-    def _handle_strings(self):
-        while self._peek() not in STRING_IDENTIFIERS and not self._is_end():
-            if self._peek() == "\n":
-                self.line += 1
-            self._advance()
-
-        if self._is_end():
-            Logger.error(
-                error_type=ErrorType.LexicalError,
-                line=self.line,
-                message="Unterminated string",
-            )
-            return
-
-        # Move ahead of final quote
-        self._advance()
-
-        # Trim quotes
-        value = self.source_code[self.start + 1 : self.current - 1]
-        self._add_token(token_type=TokenType.STRING, literal=value)
-
-    def _handle_numbers(self):
-        while self._peek().isdigit():
-            self._advance()
-
-        if self._peek() == "." and self._peek_next().isdigit():
-            # Consume . to move to the digit
-            self._advance()
-            while self._peek().isdigit():
-                self._advance()
-
-        number = float(self.source_code[self.start : self.current])
-
-        self._add_token(token_type=TokenType.NUMBER, literal=number)
-
-    def _is_alpha(self, char: str):
-        return char in VALID_IDENTIFIER_CHARACTERS
-
-    def _is_alphanumeric(self, char: str):
-        return char in VALID_IDENTIFIER_CHARACTERS or char.isdigit()
-
-    def _handle_identifiers(self):
-        while self._is_alphanumeric(self._peek()):
-            self._advance()
-        code = self.source_code[self.start : self.current]
-        token_type = KEYWORDS.get(code)
-
-        if token_type == None:
-            token_type = TokenType.IDENTIFIER
-
-        self._add_token(token_type=token_type)
+                Logger.error(
+                    error_type=ErrorType.LexicalError,
+                    line=line,
+                    message=f"Unexpected character {text}",
+                )
+
+        self.line = line
+        tokens.append(Token(TokenType.EOF, "", None, line))
+        return tokens
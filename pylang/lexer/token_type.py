@@ -2,6 +2,11 @@ from enum import Enum
 
 
 class TokenType(Enum):
+    # Members are singletons compared by identity, so hash them by identity
+    # too. Enum hashes the member name in Python code, which made every set
+    # and dict lookup keyed by a token type pay for a Python call
+    __hash__ = object.__hash__
+
     # Single-character tokens
     LEFT_PAREN = "( LEFT_PAREN"
     RIGHT_PAREN = ") RIGHT_PAREN"
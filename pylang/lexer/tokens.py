@@ -2,6 +2,12 @@ from lexer.token_type import TokenType
 
 
 class Token:
+    # Equality and hashing stay those of object, an identity check, which is
+    # all the parser needs since each token is its own object. Lexemes are
+    # interned strings and str caches its own hash, so dicts keyed by them
+    # already skip rehashing
+    __slots__ = ("token_type", "lexeme", "literal", "line")
+
     def __init__(
         self, token_type: TokenType, lexeme: str, literal: object, line: int
     ) -> None:
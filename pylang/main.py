@@ -9,7 +9,7 @@ from lexer.scanner import Scanner
 from lexer.tokens import Token
 
 
-def run(source_code: str, is_repl: bool = False):
+def run(source_code: str, is_repl: bool = False, interpreter: Interpreter = None):
     try:
         lexical_scanner: Scanner = Scanner(source_code=source_code)
         tokens: List[Token] = lexical_scanner.scan_tokens()
@@ -21,7 +21,8 @@ def run(source_code: str, is_repl: bool = False):
                 exit(64)
             return
 
-        interpreter: Interpreter = Interpreter()
+        if interpreter is None:
+            interpreter = Interpreter()
         resolver: Resolver = Resolver(interpreter=interpreter)
         resolver.resolve_statements(statements)
         interpreter.interpret(stmts=statements)
@@ -37,10 +38,13 @@ def run_file(file_path: str):
 
 
 def run_repl():
+    # One interpreter for the whole session, so globals and compiled code are
+    # kept from one line to the next
+    interpreter = Interpreter()
     try:
         while True:
             command = input(">> ")
-            run(source_code=command, is_repl=True)
+            run(source_code=command, is_repl=True, interpreter=interpreter)
     except KeyboardInterrupt:
         print("\nExiting...")
     except Exception as e:
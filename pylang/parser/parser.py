@@ -1,3 +1,4 @@
+import operator
 from typing import List
 
 from ast_pylang.expr import *
@@ -7,14 +8,114 @@ from lexer.tokens import Token
 from utils.errors import ErrorType
 from utils.logger import Logger
 
+# Binary operators evaluated at parse time when both operands are number literals
+FOLDABLE_OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.EQUAL_EQUAL: operator.eq,
+    TokenType.BANG_EQUAL: operator.ne,
+}
+
+# Binding power of each binary operator, higher binds tighter. All of them
+# are left associative
+BINARY_PRECEDENCE = {
+    TokenType.OR: 1,
+    TokenType.AND: 2,
+    TokenType.BANG_EQUAL: 3,
+    TokenType.EQUAL_EQUAL: 3,
+    TokenType.GREATER: 4,
+    TokenType.GREATER_EQUAL: 4,
+    TokenType.LESS: 4,
+    TokenType.LESS_EQUAL: 4,
+    TokenType.PLUS: 5,
+    TokenType.MINUS: 5,
+    TokenType.SLASH: 6,
+    TokenType.STAR: 6,
+}
+# Operators that build a Logical node, as they short circuit
+LOGICAL_OPERATORS = frozenset({TokenType.OR, TokenType.AND})
+
+UNARY_OPERATORS = frozenset({TokenType.BANG, TokenType.MINUS})
+LITERAL_TOKENS = frozenset({TokenType.NUMBER, TokenType.STRING})
+
+# Tokens that start a statement, used to recover after a syntax error
+SYNCHRONIZE_TOKENS = frozenset(
+    {
+        TokenType.CLASS,
+        TokenType.DEF,
+        TokenType.VAR,
+        TokenType.FOR,
+        TokenType.IF,
+        TokenType.WHILE,
+        TokenType.PRINT,
+        TokenType.RETURN,
+    }
+)
+
+# Error messages for the parts of a function or method declaration, built
+# once here rather than formatted for every declaration parsed
+FUNCTION_MESSAGES = {
+    kind: (
+        f"Expect {kind} name.",
+        f"Expect '(' after {kind} name.",
+        f"Expect '{{' before {kind} body.",
+    )
+    for kind in ("function", "method")
+}
+
+
+# Token types matched while parsing every statement and expression. Reading a
+# member off TokenType goes through the enum metaclass's __getattr__ hook and
+# costs several times a module global, so the hot paths use these instead
+_EOF = TokenType.EOF
+_IDENTIFIER = TokenType.IDENTIFIER
+_SEMICOLON = TokenType.SEMICOLON
+_EQUAL = TokenType.EQUAL
+_BANG = TokenType.BANG
+_MINUS = TokenType.MINUS
+_LEFT_PAREN = TokenType.LEFT_PAREN
+_RIGHT_PAREN = TokenType.RIGHT_PAREN
+_LEFT_BRACE = TokenType.LEFT_BRACE
+_RIGHT_BRACE = TokenType.RIGHT_BRACE
+_DOT = TokenType.DOT
+_COMMA = TokenType.COMMA
+_COLON = TokenType.COLON
+_FALSE = TokenType.FALSE
+_TRUE = TokenType.TRUE
+_NIL = TokenType.NIL
+_SUPER = TokenType.SUPER
+_SELF = TokenType.SELF
+_DEF = TokenType.DEF
+_CLASS = TokenType.CLASS
+_VAR = TokenType.VAR
+_FOR = TokenType.FOR
+_IF = TokenType.IF
+_ELSE = TokenType.ELSE
+_PRINT = TokenType.PRINT
+_RETURN = TokenType.RETURN
+_WHILE = TokenType.WHILE
+_BREAK = TokenType.BREAK
+_CONTINUE = TokenType.CONTINUE
+
 
 class ParserError(Exception):
     pass
 
 
 class Parser:
+    __slots__ = ("tokens", "types", "current", "had_error")
+
     def __init__(self, tokens: List[Token]) -> None:
         self.tokens = tokens
+        # Type of each token, read by the matching helpers below without
+        # going through the Token object
+        self.types = [token.token_type for token in tokens]
         self.current = 0
         self.had_error = False
 
@@ -39,15 +140,15 @@ class Parser:
 
     def _declaration(self) -> Stmt:
         try:
-            if self._match(TokenType.CLASS):
+            if self._match(_CLASS):
                 return self._class_declaration()
-            if self._match(TokenType.DEF):
+            if self._match(_DEF):
                 # If next token is IDENTIFIER then it is a function declaration
-                if self._peek().token_type == TokenType.IDENTIFIER:
+                if self.types[self.current] is _IDENTIFIER:
                     return self._funtion_declaration("function")
                 # Else it is a function expression which means it is an anonymous function
                 return ExpressionStmt(expression=self._function_expr())
-            if self._match(TokenType.VAR):
+            if self._match(_VAR):
                 return self._var_declaration()
             return self._statement()
         except ParserError:
@@ -55,75 +156,66 @@ class Parser:
             return None
 
     def _class_declaration(self) -> Stmt:
-        name = self._consume(TokenType.IDENTIFIER, "Expected class name.")
+        name = self._consume(_IDENTIFIER, "Expected class name.")
         superclass: Variable | None = None
 
-        if self._match(TokenType.COLON):
-            self._consume(TokenType.IDENTIFIER, "Expect superclass name.")
+        if self._match(_COLON):
+            self._consume(_IDENTIFIER, "Expect superclass name.")
             superclass = Variable(self._previous())
 
-        self._consume(TokenType.LEFT_BRACE, "Expect '{' before class body.")
+        self._consume(_LEFT_BRACE, "Expect '{' before class body.")
 
         methods = []
 
-        while (
-            not self._peek().token_type == TokenType.RIGHT_BRACE and not self._is_end()
-        ):
+        while not self._peek().token_type == _RIGHT_BRACE and not self._is_end():
             methods.append(self._funtion_declaration("method"))
 
-        self._consume(TokenType.RIGHT_BRACE, "Expect '}' after class body.")
+        self._consume(_RIGHT_BRACE, "Expect '}' after class body.")
         return ClassStmt(name=name, superclass=superclass, methods=methods)
 
     def _funtion_declaration(self, kind: str) -> Stmt:
-        name = self._consume(TokenType.IDENTIFIER, f"Expect {kind} name.")
-        self._consume(TokenType.LEFT_PAREN, f"Expect '(' after {kind} name.")
+        name_message, paren_message, body_message = FUNCTION_MESSAGES[kind]
+        name = self._consume(_IDENTIFIER, name_message)
+        self._consume(_LEFT_PAREN, paren_message)
         parameters = []
 
         # Consume parameters
-        if not self._peek().token_type == TokenType.RIGHT_PAREN:
-            parameters.append(
-                self._consume(TokenType.IDENTIFIER, "Expect parameter name.")
-            )
-            while self._match(TokenType.COMMA):
+        if not self._peek().token_type == _RIGHT_PAREN:
+            parameters.append(self._consume(_IDENTIFIER, "Expect parameter name."))
+            while self._match(_COMMA):
                 if len(parameters) >= 255:
                     Logger.error(
                         ErrorType.SyntaxError,
                         self._peek().line,
                         "Cannot have more than 255 parameters.",
                     )
-                parameters.append(
-                    self._consume(TokenType.IDENTIFIER, "Expect parameter name.")
-                )
+                parameters.append(self._consume(_IDENTIFIER, "Expect parameter name."))
 
-        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
+        self._consume(_RIGHT_PAREN, "Expect ')' after parameters.")
 
         # Consume body
-        self._consume(TokenType.LEFT_BRACE, f"Expect '{'{'}' before {kind} body.")
+        self._consume(_LEFT_BRACE, body_message)
         body = self._block()
         return FunctionStmt(name=name, params=parameters, body=body)
 
     def _function_expr(self) -> Expr:
         # Since it is an anonymous function, it does not have a name
-        self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'def'.")
+        self._consume(_LEFT_PAREN, "Expect '(' after 'def'.")
         parameters = []
 
-        if not self._peek().token_type == TokenType.RIGHT_PAREN:
-            parameters.append(
-                self._consume(TokenType.IDENTIFIER, "Expect parameter name.")
-            )
-            while self._match(TokenType.COMMA):
+        if not self._peek().token_type == _RIGHT_PAREN:
+            parameters.append(self._consume(_IDENTIFIER, "Expect parameter name."))
+            while self._match(_COMMA):
                 if len(parameters) >= 255:
                     Logger.error(
                         ErrorType.SyntaxError,
                         self._peek().line,
                         "Cannot have more than 255 parameters.",
                     )
-                parameters.append(
-                    self._consume(TokenType.IDENTIFIER, "Expect parameter name.")
-                )
+                parameters.append(self._consume(_IDENTIFIER, "Expect parameter name."))
 
-        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
-        self._consume(TokenType.LEFT_BRACE, "Expect '{' before function body.")
+        self._consume(_RIGHT_PAREN, "Expect ')' after parameters.")
+        self._consume(_LEFT_BRACE, "Expect '{' before function body.")
 
         body = self._block()
 
@@ -132,54 +224,53 @@ class Parser:
         )  # Anonymous function expression
 
     def _var_declaration(self) -> Stmt:
-        name = self._consume(TokenType.IDENTIFIER, "Expected variable name.")
+        name = self._consume(_IDENTIFIER, "Expected variable name.")
 
         initializer = None
-        if self._match(TokenType.EQUAL):
+        if self._match(_EQUAL):
             initializer = self._expression()
 
-        self._consume(TokenType.SEMICOLON, "Expect ';' after variable declaration.")
+        self._consume(_SEMICOLON, "Expect ';' after variable declaration.")
         return VarStmt(name=name, initializer=initializer)
 
     def _statement(self) -> Stmt:
-        if self._match(TokenType.FOR):
+        if self._match(_FOR):
             return self._for_statement()
-        if self._match(TokenType.IF):
+        if self._match(_IF):
             return self._if_statement()
-        if self._match(TokenType.PRINT):
+        if self._match(_PRINT):
             return self._print_statement()
-        if self._match(TokenType.RETURN):
+        if self._match(_RETURN):
             return self._return_statement()
-        if self._match(TokenType.WHILE):
+        if self._match(_WHILE):
             return self._while_statement()
-        if self._match(TokenType.BREAK) or self._match(TokenType.CONTINUE):
+        if self._match(_BREAK) or self._match(_CONTINUE):
             return self._break_continue_statement()
-        if self._match(TokenType.LEFT_BRACE):
+        if self._match(_LEFT_BRACE):
             return BlockStmt(statements=self._block())
         return self._expression_statement()
 
     def _block(self) -> List[Stmt]:
         statements = []
 
-        while (
-            not self._peek().token_type == TokenType.RIGHT_BRACE and not self._is_end()
-        ):
+        types = self.types
+        while types[self.current] is not _RIGHT_BRACE and not self._is_end():
             statements.append(self._declaration())
 
-        self._consume(TokenType.RIGHT_BRACE, "Expect '}' after block.")
+        self._consume(_RIGHT_BRACE, "Expect '}' after block.")
         return statements
 
     def _print_statement(self) -> Stmt:
         value = self._expression()
-        self._consume(TokenType.SEMICOLON, "Expect ';' after value.")
+        self._consume(_SEMICOLON, "Expect ';' after value.")
         return PrintStmt(expression=value)
 
     def _return_statement(self) -> Stmt:
         keyword = self._previous()
         value = None
-        if not (self._peek().token_type == TokenType.SEMICOLON):
+        if self.types[self.current] is not _SEMICOLON:
             value = self._expression()
-        self._consume(TokenType.SEMICOLON, "Expect ';' after return value.")
+        self._consume(_SEMICOLON, "Expect ';' after return value.")
 
         return ReturnStmt(keyword=keyword, value=value)
 
@@ -188,27 +279,27 @@ class Parser:
         This is C style for loop but in backend it is just a syntactic sugar
         for the while loop. We will desugar it to while loop.
         """
-        self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
+        self._consume(_LEFT_PAREN, "Expect '(' after 'for'.")
 
         # Handle initialiser part
-        if self._match(TokenType.SEMICOLON):
+        if self._match(_SEMICOLON):
             initializer = None
-        elif self._match(TokenType.VAR):
+        elif self._match(_VAR):
             initializer = self._var_declaration()
         else:
             initializer = self._expression_statement()
 
         # Handle condition part
         condition = None
-        if self._peek().token_type != TokenType.SEMICOLON:
+        if self._peek().token_type != _SEMICOLON:
             condition = self._expression()
-        self._consume(TokenType.SEMICOLON, "Expect ';' after loop condition.")
+        self._consume(_SEMICOLON, "Expect ';' after loop condition.")
 
         # Handle increment part
         increment = None
-        if not self._peek().token_type == TokenType.RIGHT_PAREN:
+        if not self._peek().token_type == _RIGHT_PAREN:
             increment = self._expression()
-        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
+        self._consume(_RIGHT_PAREN, "Expect ')' after for clauses.")
 
         body = self._statement()
         if increment is not None:
@@ -221,13 +312,13 @@ class Parser:
         return body
 
     def _if_statement(self) -> Stmt:
-        self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
+        self._consume(_LEFT_PAREN, "Expect '(' after 'if'.")
         condition = self._expression()
-        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after if condition.")
+        self._consume(_RIGHT_PAREN, "Expect ')' after if condition.")
 
         then_branch = self._statement()
         else_branch = None
-        if self._match(TokenType.ELSE):
+        if self._match(_ELSE):
             else_branch = self._statement()
 
         return IfStmt(
@@ -235,9 +326,9 @@ class Parser:
         )
 
     def _while_statement(self) -> Stmt:
-        self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'while'.")
+        self._consume(_LEFT_PAREN, "Expect '(' after 'while'.")
         condition = self._expression()
-        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after while condition.")
+        self._consume(_RIGHT_PAREN, "Expect ')' after while condition.")
 
         body = self._statement()
         return WhileStmt(condition=condition, body=body)
@@ -246,27 +337,27 @@ class Parser:
         keyword = self._previous()
         stmt = None
 
-        if keyword.token_type == TokenType.BREAK:
+        if keyword.token_type == _BREAK:
             stmt = BreakStmt(keyword=keyword)
-        elif keyword.token_type == TokenType.CONTINUE:
+        elif keyword.token_type == _CONTINUE:
             stmt = ContinueStmt(keyword=keyword)
 
-        self._consume(TokenType.SEMICOLON, "Expect ';' after break/continue statement.")
+        self._consume(_SEMICOLON, "Expect ';' after break/continue statement.")
 
         return stmt
 
     def _expression_statement(self) -> Stmt:
         value = self._expression()
-        self._consume(TokenType.SEMICOLON, "Expect ';' after expression.")
+        self._consume(_SEMICOLON, "Expect ';' after expression.")
         return ExpressionStmt(expression=value)
 
     def _expression(self) -> Expr:
         return self._assignment()
 
     def _assignment(self) -> Expr:
-        expr = self._or()
+        expr = self._binary()
 
-        if self._match(TokenType.EQUAL):
+        if self._match(_EQUAL):
             equals = self._previous()
             value = self._assignment()
 
@@ -282,89 +373,84 @@ class Parser:
 
         return expr
 
-    def _or(self) -> Expr:
-        expr = self._and()
-
-        while self._match(TokenType.OR):
-            operator = self._previous()
-            right = self._and()
-            expr = Logical(left=expr, operator=operator, right=right)
-
-        return expr
-
-    def _and(self) -> Expr:
-        expr = self._equality()
-
-        while self._match(TokenType.AND):
-            operator = self._previous()
-            right = self._equality()
-            expr = Logical(left=expr, operator=operator, right=right)
+    def _binary(self, min_precedence: int = 1) -> Expr:
+        """
+        Parses the operators from "or" down to "*" and "/" by precedence
+        climbing. Each operator costs one call for its right operand, where
+        a method per precedence level cost a call per level for every
+        operand whether it had operators or not.
+        """
+        binary = self._binary
+        make_binary = self._make_binary
+        types = self.types
 
-        return expr
+        expr = self._unary()
 
-    def _equality(self) -> Expr:
-        expr = self._comparison()
+        while True:
+            precedence = BINARY_PRECEDENCE.get(types[self.current])
+            if precedence is None or precedence < min_precedence:
+                return expr
 
-        while self._match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
-            operator = self._previous()
-            right = self._comparison()
-            expr = Binary(left=expr, operator=operator, right=right)
+            operator = self.tokens[self.current]
+            self.current += 1
+            # Operators of the same precedence are left to this loop, which
+            # makes them left associative
+            right = binary(precedence + 1)
+            if operator.token_type in LOGICAL_OPERATORS:
+                expr = Logical(left=expr, operator=operator, right=right)
+            else:
+                expr = make_binary(left=expr, operator=operator, right=right)
 
-        return expr
+    def _unary(self) -> Expr:
+        current = self.current
+        if self.types[current] in UNARY_OPERATORS:
+            operator = self.tokens[current]
+            self.current = current + 1
+            right = self._unary()
+            return self._make_unary(operator=operator, right=right)
 
-    def _comparison(self) -> Expr:
-        expr = self._term()
+        return self._call()
 
-        while self._match(
-            TokenType.GREATER,
-            TokenType.GREATER_EQUAL,
-            TokenType.LESS,
-            TokenType.LESS_EQUAL,
+    def _make_binary(self, left: Expr, operator: Token, right: Expr) -> Expr:
+        # Fold constant arithmetic like 1 + 2 into a single literal so it is
+        # not recomputed every time the expression is evaluated
+        if (
+            isinstance(left, Literal)
+            and isinstance(right, Literal)
+            and type(left.value) is float
+            and type(right.value) is float
         ):
-            operator = self._previous()
-            right = self._term()
-            expr = Binary(left=expr, operator=operator, right=right)
+            fold = FOLDABLE_OPERATORS.get(operator.token_type)
+            if fold is not None:
+                try:
+                    return Literal(fold(left.value, right.value))
+                except ZeroDivisionError:
+                    # Leave it to the interpreter to report at runtime
+                    pass
 
-        return expr
-
-    def _term(self) -> Expr:
-        expr = self._factor()
-
-        while self._match(TokenType.PLUS, TokenType.MINUS):
-            operator = self._previous()
-            right = self._factor()
-            expr = Binary(left=expr, operator=operator, right=right)
+        return Binary(left=left, operator=operator, right=right)
 
-        return expr
+    def _make_unary(self, operator: Token, right: Expr) -> Expr:
+        if isinstance(right, Literal):
+            if operator.token_type == _BANG:
+                return Literal(right.value is None or right.value is False)
+            if operator.token_type == _MINUS and type(right.value) is float:
+                return Literal(-right.value)
 
-    def _factor(self) -> Expr:
-        expr = self._unary()
-
-        while self._match(TokenType.SLASH, TokenType.STAR):
-            operator = self._previous()
-            right = self._unary()
-            expr = Binary(left=expr, operator=operator, right=right)
-
-        return expr
-
-    def _unary(self) -> Expr:
-        if self._match(TokenType.BANG, TokenType.MINUS):
-            operator = self._previous()
-            right = self._unary()
-            return Unary(operator=operator, right=right)
-
-        return self._call()
+        return Unary(operator=operator, right=right)
 
     def _call(self) -> Expr:
         expr = self._primary()
 
+        types = self.types
         while True:
-            if self._match(TokenType.LEFT_PAREN):
+            token_type = types[self.current]
+            if token_type is _LEFT_PAREN:
+                self.current += 1
                 expr = self._finish_call(expr)
-            elif self._match(TokenType.DOT):
-                name = self._consume(
-                    TokenType.IDENTIFIER, "Expect property name after '.'."
-                )
+            elif token_type is _DOT:
+                self.current += 1
+                name = self._consume(_IDENTIFIER, "Expect property name after '.'.")
                 expr = Get(object=expr, name=name)
             else:
                 break
@@ -373,9 +459,9 @@ class Parser:
 
     def _finish_call(self, callee: Expr) -> Expr:
         arguments = []
-        if not self._peek().token_type == TokenType.RIGHT_PAREN:
+        if self.types[self.current] is not _RIGHT_PAREN:
             arguments.append(self._expression())
-            while self._match(TokenType.COMMA):
+            while self._match(_COMMA):
                 if len(arguments) >= 255:
                     Logger.error(
                         ErrorType.SyntaxError,
@@ -383,97 +469,99 @@ class Parser:
                         "Cannot have more than 255 arguments.",
                     )
                 arguments.append(self._expression())
-        paren = self._consume(TokenType.RIGHT_PAREN, "Expect ')' after arguments.")
+        paren = self._consume(_RIGHT_PAREN, "Expect ')' after arguments.")
         return Call(callee=callee, paren=paren, arguments=arguments)
 
     def _primary(self) -> Expr:
-        if self._match(TokenType.FALSE):
+        # Every alternative starts with a different token, so the token is
+        # read once and consumed here. Names and literals come first, they
+        # are by far the most common
+        current = self.current
+        token_type = self.types[current]
+        token = self.tokens[current]
+
+        if token_type is _IDENTIFIER:
+            self.current = current + 1
+            return Variable(token)
+
+        if token_type in LITERAL_TOKENS:
+            self.current = current + 1
+            return Literal(token.literal)
+
+        if token_type is _FALSE:
+            self.current = current + 1
             return Literal(False)
-        if self._match(TokenType.TRUE):
+        if token_type is _TRUE:
+            self.current = current + 1
             return Literal(True)
-        if self._match(TokenType.NIL):
+        if token_type is _NIL:
+            self.current = current + 1
             return Literal(None)
 
-        if self._match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self._previous().literal)
-
-        if self._match(TokenType.SUPER):
-            keyword = self._previous()
-            self._consume(TokenType.DOT, "Expected '.' after 'super'.")
-            method = self._consume(
-                TokenType.IDENTIFIER, "Expected superclass method name."
-            )
-            return Super(keyword=keyword, method=method)
+        if token_type is _SUPER:
+            self.current = current + 1
+            self._consume(_DOT, "Expected '.' after 'super'.")
+            method = self._consume(_IDENTIFIER, "Expected superclass method name.")
+            return Super(keyword=token, method=method)
 
-        if self._match(TokenType.SELF):
-            return Self(keyword=self._previous())
+        if token_type is _SELF:
+            self.current = current + 1
+            return Self(keyword=token)
 
-        if self._match(TokenType.LEFT_PAREN):
+        if token_type is _LEFT_PAREN:
+            self.current = current + 1
             expr = self._expression()
-            self._consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
+            self._consume(_RIGHT_PAREN, "Expect ')' after expression.")
             return expr
 
-        if self._match(TokenType.DEF):
+        if token_type is _DEF:
             # If next token is def it is an anonymous function
+            self.current = current + 1
             return self._function_expr()
 
-        if self._match(TokenType.IDENTIFIER):
-            return Variable(self._previous())
-
-        self._error(self._peek(), "Expected expression.")
+        self._error(token, "Expected expression.")
 
     def _consume(self, token_type: TokenType, message: str) -> Token:
-        if self._match(token_type):
-            return self._previous()
+        current = self.current
+        if self.types[current] is token_type:
+            self.current = current + 1
+            return self.tokens[current]
 
-        current_token = self._peek()
-        if current_token.token_type == TokenType.EOF:
-            self._error(current_token, message)
-        else:
-            self._error(current_token, message)
+        self._error(self.tokens[current], message)
 
     def _synchronize(self):
         self._advance()
 
         while not self._is_end():
-            if self._previous().token_type == TokenType.SEMICOLON:
+            if self._previous().token_type == _SEMICOLON:
                 return
 
-            if self._peek().token_type in [
-                TokenType.CLASS,
-                TokenType.DEF,
-                TokenType.VAR,
-                TokenType.FOR,
-                TokenType.IF,
-                TokenType.WHILE,
-                TokenType.PRINT,
-                TokenType.RETURN,
-            ]:
+            if self._peek().token_type in SYNCHRONIZE_TOKENS:
                 return
 
             self._advance()
 
-    def _match(self, *types: TokenType) -> bool:
-        if self._is_end():
-            return False
-
-        if self._peek().token_type in types:
-            self._advance()
+    def _match(self, token_type: TokenType) -> bool:
+        # EOF is never matched, so a matching token is never the end
+        current = self.current
+        if self.types[current] is token_type:
+            self.current = current + 1
             return True
 
         return False
 
     def _is_end(self) -> bool:
-        return self._peek().token_type == TokenType.EOF
+        return self.types[self.current] is _EOF
 
     def _peek(self) -> Token:
         return self.tokens[self.current]
 
     def _advance(self) -> Token:
-        if not self._is_end():
-            self.current += 1
+        current = self.current
+        if self.types[current] is not _EOF:
+            current = self.current = current + 1
 
-        return self._previous()
+        return self.tokens[current - 1]
 
     def _previous(self) -> Token:
         return self.tokens[self.current - 1]
@@ -1,3 +1,11 @@
+"""
+Obsolete. Generated the first versions of ast_pylang/expr.py and
+ast_pylang/stmt.py. Both are maintained by hand now: their nodes are slotted
+dataclasses with runtime fields (pure, local, op_type, chunk, generated,
+scoped) that the compiler and VM depend on, which this script does not emit.
+Running it would overwrite them with nodes missing those fields.
+"""
+
 import errno
 import sys
 from io import TextIOWrapper
@@ -72,6 +80,7 @@ class {base_name}(ABC):
 def main():
     if len(sys.argv) != 2:
         print("Usage: python {__name__}.py <output_directory>")
+        print("Obsolete: the generated nodes lack fields the interpreter needs")
         sys.exit(errno.EINVAL)
     output_dir = sys.argv[1]
 
@@ -23,21 +23,3 @@ class ResolverError(Exception):
         self.message = message
         self.error_type = ErrorType.ResolverError
         super().__init__(message)
-
-
-class Return(Exception):
-    def __init__(self, value: object) -> None:
-        self.value = value
-        super().__init__(value)
-
-
-class Break(Exception):
-    def __init__(self, token: Token) -> None:
-        self.token = token
-        super().__init__(token)
-
-
-class Continue(Exception):
-    def __init__(self, token: Token) -> None:
-        self.token = token
-        super().__init__(token)